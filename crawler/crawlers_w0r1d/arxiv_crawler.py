@@ -2,18 +2,137 @@
 arXiv paper crawler - crawls latest papers from arXiv
 """
 import arxiv
-from typing import List, Dict
-from datetime import datetime, timedelta
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional
+from datetime import date, datetime, timedelta
 from utils import get_logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    # orjson is optional; the stdlib json produces the same cache files
+    import json
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
 logger = get_logger("ArxivCrawler")
 
+# arXiv publishes new listings once a day
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Largest page the arXiv API serves per request; fewer pages means fewer
+# delay_seconds pauses between requests
+MAX_PAGE_SIZE = 2000
+
 
 class ArxivCrawler:
     """Crawler for arXiv papers"""
     
-    def __init__(self):
-        self.client = arxiv.Client()
+    def __init__(self, cache_dir: Optional[str] = None):
+        # Keep delay_seconds >= 3 to respect arXiv's rate limit policy
+        self.client = arxiv.Client(page_size=MAX_PAGE_SIZE, delay_seconds=3.0, num_retries=5)
+        # Guards temporary page_size changes on the shared client; all
+        # requests go through this one client so delay_seconds is honoured
+        self._client_lock = threading.Lock()
+        self.cache_dir = Path(cache_dir or "~/.cache/arxiv_crawler").expanduser()
+        # Per-instance cache, so it doesn't keep the crawler alive the way
+        # lru_cache on the method (keyed by self) would
+        self._fetch_paper_by_id = functools.lru_cache(maxsize=256)(self._fetch_paper_by_id_uncached)
+    
+    def _cache_path(self, query: str, max_results: int, days: int) -> Path:
+        """Build the cache file path for a query, keyed by the current day"""
+        key = hashlib.sha1(f"{query}|{max_results}|{days}|{date.today()}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.json"
+    
+    def _load_cache(self, path: Path) -> Optional[List[Dict]]:
+        """Load cached papers if the cache file is fresh"""
+        try:
+            if time.time() - path.stat().st_mtime > CACHE_TTL_SECONDS:
+                return None
+            return _json_loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+    
+    def _save_cache(self, path: Path, papers: List[Dict]):
+        """Atomically write papers to the cache file"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_json_dumps(papers))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Failed to write arXiv cache {path}: {e}")
+    
+    def iter_papers(
+        self,
+        query: str = "medical imaging",
+        max_results: int = 10,
+        days: int = 7
+    ) -> Iterator[Dict]:
+        """
+        Lazily yield papers from arXiv as result pages arrive
+        
+        Stopping iteration early (e.g. with itertools.islice) also stops
+        fetching further result pages.
+        
+        Args:
+            query: Search query (e.g., "medical imaging", "computer vision")
+            max_results: Maximum number of papers to return
+            days: Number of days back to search
+            
+        Yields:
+            Paper metadata
+        """
+        # Calculate date range
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        
+        # Build search query; the date range is filtered server-side
+        search_query = (
+            f"({query}) AND submittedDate:"
+            f"[{start_date.strftime('%Y%m%d%H%M')} TO {end_date.strftime('%Y%m%d%H%M')}]"
+        )
+        
+        # Search arXiv
+        search = arxiv.Search(
+            query=search_query,
+            max_results=max_results,
+            sort_by=arxiv.SortCriterion.SubmittedDate,
+            sort_order=arxiv.SortOrder.Descending
+        )
+        
+        if max_results >= MAX_PAGE_SIZE:
+            for result in self.client.results(search):
+                yield self._to_dict(result)
+            return
+
+        # Request no more than needed per page, so small queries don't
+        # download a full 2000-entry page. A small query fits in one page,
+        # so fetch it while holding the lock and restore page_size before
+        # yielding; interleaved generators never see each other's page size
+        with self._client_lock:
+            self.client.page_size = max(1, max_results)
+            try:
+                results = list(self.client.results(search))
+            finally:
+                self.client.page_size = MAX_PAGE_SIZE
+        for result in results:
+            yield self._to_dict(result)
     
     def crawl_papers(
         self,
@@ -32,37 +151,17 @@ class ArxivCrawler:
         Returns:
             List of paper metadata
         """
+        cache_path = self._cache_path(query, max_results, days)
+        cached = self._load_cache(cache_path)
+        if cached is not None:
+            logger.info(f"Loaded {len(cached)} papers from cache")
+            return cached
+        
         try:
-            # Calculate date range
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-            
-            # Build search query
-            search_query = f"{query} AND submittedDate:[{start_date.strftime('%Y%m%d')}* TO {end_date.strftime('%Y%m%d')}*]"
-            
-            # Search arXiv
-            search = arxiv.Search(
-                query=query,
-                max_results=max_results,
-                sort_by=arxiv.SortCriterion.SubmittedDate,
-                sort_order=arxiv.SortOrder.Descending
-            )
-            
-            papers = []
-            for result in self.client.results(search):
-                papers.append({
-                    "title": result.title,
-                    "authors": [author.name for author in result.authors],
-                    "summary": result.summary,
-                    "published": result.published.isoformat(),
-                    "updated": result.updated.isoformat(),
-                    "pdf_url": result.pdf_url,
-                    "categories": result.categories,
-                    "primary_category": result.primary_category,
-                    "arxiv_id": result.entry_id.split("/")[-1]
-                })
+            papers = list(self.iter_papers(query, max_results, days))
             
             logger.info(f"Crawled {len(papers)} papers from arXiv")
+            self._save_cache(cache_path, papers)
             return papers
             
         except Exception as e:
@@ -80,21 +179,52 @@ class ArxivCrawler:
             Paper metadata
         """
         try:
-            search = arxiv.Search(id_list=[arxiv_id])
-            result = next(self.client.results(search))
-            
-            return {
-                "title": result.title,
-                "authors": [author.name for author in result.authors],
-                "summary": result.summary,
-                "published": result.published.isoformat(),
-                "updated": result.updated.isoformat(),
-                "pdf_url": result.pdf_url,
-                "categories": result.categories,
-                "primary_category": result.primary_category,
-                "arxiv_id": result.entry_id.split("/")[-1]
-            }
-            
+            return dict(self._fetch_paper_by_id(arxiv_id))
         except Exception as e:
             logger.error(f"Failed to get paper {arxiv_id}: {e}")
             return {}
+    
+    def _fetch_paper_by_id_uncached(self, arxiv_id: str) -> Dict:
+        """Fetch a paper by ID; failures raise and are therefore not cached"""
+        search = arxiv.Search(id_list=[arxiv_id])
+        return self._to_dict(next(self.client.results(search)))
+    
+    def get_papers_by_ids(self, arxiv_ids: List[str]) -> List[Dict]:
+        """
+        Get several papers in one batched arXiv request
+        
+        Args:
+            arxiv_ids: arXiv paper IDs (e.g., ["2301.00001", "2301.00002"])
+            
+        Returns:
+            List of paper metadata
+        """
+        arxiv_ids = list(arxiv_ids)
+        if not arxiv_ids:
+            return []
+        
+        try:
+            search = arxiv.Search(id_list=arxiv_ids, max_results=len(arxiv_ids))
+            papers = [self._to_dict(result) for result in self.client.results(search)]
+            
+            logger.info(f"Fetched {len(papers)} papers by ID from arXiv")
+            return papers
+            
+        except Exception as e:
+            logger.error(f"Failed to get papers {arxiv_ids}: {e}")
+            return []
+    
+    @staticmethod
+    def _to_dict(result: arxiv.Result) -> Dict:
+        """Convert an arxiv result into paper metadata"""
+        return {
+            "title": result.title,
+            "authors": tuple(author.name for author in result.authors),
+            "summary": result.summary,
+            "published": result.published.isoformat(),
+            "updated": result.updated.isoformat(),
+            "pdf_url": result.pdf_url,
+            "categories": tuple(result.categories),
+            "primary_category": result.primary_category,
+            "arxiv_id": result.entry_id.split("/")[-1]
+        }
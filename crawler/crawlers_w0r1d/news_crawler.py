@@ -1,28 +1,59 @@
 """
 News crawler - crawls latest news from various sources
 """
-import requests
+import asyncio
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+import feedparser
 from typing import List, Dict
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 from utils import get_logger
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    # orjson is optional; fall back to the stdlib decoder
+    from json import loads as _json_loads
+
 logger = get_logger("Newscrawler")
 
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
 
 class NewsCrawler:
     """Crawler for news articles"""
     
     def __init__(self, api_key: str = None):
         self.api_key = api_key
-        self.session = requests.Session()
+        self.session = None
     
-    def crawl_news_api(self, query: str = "technology", days: int = 1) -> List[Dict]:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared aiohttp session, creating it on first use"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self.session
+    
+    async def aclose(self):
+        """Close the shared aiohttp session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def _afetch(self, session: aiohttp.ClientSession, url: str, params: Dict) -> Dict:
+        """Fetch a URL and decode the JSON body (orjson when installed)"""
+        async with session.get(url, params=params) as response:
+            response.raise_for_status()
+            return _json_loads(await response.read())
+    
+    async def acrawl_news_api(self, queries: List[str], days: int = 1) -> List[Dict]:
         """
-        Crawl news from NewsAPI
+        Crawl news from NewsAPI for several queries concurrently
         
         Args:
-            query: Search query
+            queries: Search queries
             days: Number of days back to search
             
         Returns:
@@ -32,24 +63,30 @@ class NewsCrawler:
             logger.warning("No NewsAPI key provided, using sample data")
             return self._get_sample_news()
         
-        url = "https://newsapi.org/v2/everything"
         from_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
         
-        params = {
-            "q": query,
-            "from": from_date,
-            "sortBy": "publishedAt",
-            "apiKey": self.api_key,
-            "language": "en",
-            "pageSize": 10
-        }
+        session = await self._get_session()
+        coros = [
+            self._afetch(session, NEWS_API_URL, {
+                "q": query,
+                "from": from_date,
+                "sortBy": "publishedAt",
+                "apiKey": self.api_key,
+                "language": "en",
+                "pageSize": 10
+            })
+            for query in queries
+        ]
+        results = await asyncio.gather(*coros, return_exceptions=True)
         
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+        articles = []
+        failed = 0
+        for query, data in zip(queries, results):
+            if isinstance(data, Exception):
+                failed += 1
+                logger.error(f"Failed to crawl news for '{query}': {data}")
+                continue
             
-            articles = []
             for article in data.get("articles", []):
                 articles.append({
                     "title": article.get("title"),
@@ -59,14 +96,57 @@ class NewsCrawler:
                     "published_at": article.get("publishedAt"),
                     "content": article.get("content", "")
                 })
-            
-            logger.info(f"Crawled {len(articles)} news articles")
-            return articles
-            
-        except Exception as e:
-            logger.error(f"Failed to crawl news: {e}")
+        
+        if failed and not articles:
             logger.warning("Falling back to sample data for testing")
             return self._get_sample_news()
+        
+        logger.info(f"Crawled {len(articles)} news articles")
+        return articles
+    
+    def crawl_news_api(self, query: str = "technology", days: int = 1) -> List[Dict]:
+        """
+        Crawl news from NewsAPI
+        
+        Blocking wrapper around acrawl_news_api; async callers should await
+        acrawl_news_api directly.
+        
+        Args:
+            query: Search query
+            days: Number of days back to search
+            
+        Returns:
+            List of news articles
+        """
+        async def _run():
+            try:
+                return await self.acrawl_news_api([query], days)
+            finally:
+                await self.aclose()
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(_run())
+        
+        # Called from inside a running loop: asyncio.run would raise, so run
+        # the coroutine on a fresh loop in a worker thread and block on it
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, _run()).result()
+    
+    def _parse_feed(self, feed) -> List[Dict]:
+        """Convert a parsed feed into article dicts"""
+        articles = []
+        for entry in feed.entries[:10]:
+            articles.append({
+                "title": entry.get("title"),
+                "description": entry.get("summary", ""),
+                "url": entry.get("link"),
+                "source": feed.feed.get("title", "RSS"),
+                "published_at": entry.get("published", ""),
+                "content": entry.get("description", "")
+            })
+        return articles
     
     def crawl_rss_feed(self, feed_url: str) -> List[Dict]:
         """
@@ -78,21 +158,9 @@ class NewsCrawler:
         Returns:
             List of news articles
         """
-        import feedparser
-        
         try:
             feed = feedparser.parse(feed_url)
-            articles = []
-            
-            for entry in feed.entries[:10]:
-                articles.append({
-                    "title": entry.get("title"),
-                    "description": entry.get("summary", ""),
-                    "url": entry.get("link"),
-                    "source": feed.feed.get("title", "RSS"),
-                    "published_at": entry.get("published", ""),
-                    "content": entry.get("description", "")
-                })
+            articles = self._parse_feed(feed)
             
             logger.info(f"Crawled {len(articles)} articles from RSS feed")
             return articles
@@ -101,6 +169,32 @@ class NewsCrawler:
             logger.error(f"Failed to crawl RSS feed: {e}")
             return []
     
+    async def acrawl_rss_feeds(self, feed_urls: List[str]) -> List[Dict]:
+        """
+        Crawl several RSS feeds concurrently in the default thread pool
+        
+        Args:
+            feed_urls: URLs of the RSS feeds
+            
+        Returns:
+            List of news articles
+        """
+        loop = asyncio.get_running_loop()
+        feeds = await asyncio.gather(
+            *(loop.run_in_executor(None, feedparser.parse, url) for url in feed_urls),
+            return_exceptions=True
+        )
+        
+        articles = []
+        for feed_url, feed in zip(feed_urls, feeds):
+            if isinstance(feed, Exception):
+                logger.error(f"Failed to crawl RSS feed {feed_url}: {feed}")
+                continue
+            articles.extend(self._parse_feed(feed))
+        
+        logger.info(f"Crawled {len(articles)} articles from {len(feed_urls)} RSS feeds")
+        return articles
+    
     def _get_sample_news(self) -> List[Dict]:
         """Get sample news for testing"""
         return [
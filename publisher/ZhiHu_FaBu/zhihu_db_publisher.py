@@ -1,13 +1,14 @@
 import os
 import time
-import platform
+import signal
+import threading
+import traceback
 import pymysql
-import pyperclip
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date  # 用于获取今日日期
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
@@ -25,25 +26,81 @@ DB_CONFIG = {
 
 # ==============================================
 
+# 在编辑器内模拟一次粘贴事件：编辑器自身的粘贴处理（含 Markdown 解析弹窗）照常触发，
+# 若无人处理则退回 insertText；整篇正文只需一次脚本调用，不依赖系统剪贴板
+_PASTE_SCRIPT = """
+const root = arguments[0], text = arguments[1];
+const target = root.matches('[contenteditable="true"]')
+    ? root : (root.querySelector('[contenteditable="true"]') || root);
+target.focus();
+const data = new DataTransfer();
+data.setData('text/plain', text);
+const evt = new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true});
+target.dispatchEvent(evt);
+if (!evt.defaultPrevented) {
+    document.execCommand('insertText', false, text);
+}
+"""
+
+
 class ZhihuDBPublisher:
+    # 页面元素定位器，类加载时构建一次
+    _SEL_TITLE = (By.CSS_SELECTOR, 'textarea[placeholder*="标题"]')
+    # 两个候选编辑器合并为一个选择器，一次 find_elements 即可（文档顺序下 DraftEditor-root 在前）
+    _SEL_EDITOR = (By.CSS_SELECTOR, '.DraftEditor-root, div[contenteditable="true"]')
+    _SEL_MARKDOWN_CONFIRM = (By.XPATH, "//*[contains(text(), '确认并解析')]")
+    _SEL_PUBLISH_BTN = (By.XPATH, "//button[contains(text(), '发布')]")
+    _SEL_MODAL_CONFIRM = (By.CSS_SELECTOR, ".Modal-wrapper button.Button--primary")
+
+    # WebDriverWait 轮询间隔（默认 0.5s），每次轮询都是一次到 chromedriver 的请求
+    _POLL_FREQUENCY = 0.1
+
+    # 每轮休息时长，以及休息结束前多久开始在后台预取下一批数据（秒）
+    _REST_SECONDS = 300
+    _PREFETCH_LEAD_SECONDS = 30
+
     def __init__(self, db_config):
         self.db_config = db_config
         self.driver = None
         self.article_list = []
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.record_file = os.path.join(self.base_dir, "published_ids.txt")
-
-    def get_published_ids(self):
-        """读取本地记录，获取已发布的文章ID"""
+        self._conn = None
+        self._published_ids = self._load_published_ids()
+        self._record_fp = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._stop = threading.Event()
+        self._new_article = threading.Event()
+
+    def _load_published_ids(self):
+        """启动时读取一次本地记录，获取已发布的文章ID"""
         if not os.path.exists(self.record_file):
             return set()
         with open(self.record_file, 'r', encoding='utf-8') as f:
             return set(line.strip() for line in f if line.strip())
 
+    def get_published_ids(self):
+        """获取已发布的文章ID（内存中维护，无需每次重读文件）"""
+        return self._published_ids
+
     def save_published_id(self, article_id):
-        """将发布成功的ID写入本地记录"""
-        with open(self.record_file, 'a', encoding='utf-8') as f:
-            f.write(f"{article_id}\n")
+        """将发布成功的ID写入内存集合，并追加到本地记录"""
+        self._published_ids.add(str(article_id))
+        if self._record_fp is None:
+            # 行缓冲：每写一行即落盘，文件句柄常驻
+            self._record_fp = open(self.record_file, 'a', encoding='utf-8', buffering=1)
+        self._record_fp.write(f"{article_id}\n")
+
+    def _get_conn(self):
+        """获取数据库长连接，断线时自动重连，避免每次轮询都重新握手"""
+        if self._conn is not None and self._conn.open:
+            try:
+                self._conn.ping(reconnect=True)
+                return self._conn
+            except pymysql.Error:
+                pass
+        self._conn = pymysql.connect(**self.db_config, autocommit=True)
+        return self._conn
 
     def fetch_daily_articles(self):
         """从数据库获取【当日】未发布的文章"""
@@ -53,11 +110,16 @@ class ZhihuDBPublisher:
         published_ids = self.get_published_ids()
 
         try:
-            conn = pymysql.connect(**self.db_config)
+            conn = self._get_conn()
             with conn.cursor(pymysql.cursors.DictCursor) as cur:
-                # 只获取今日且内容不为空的数据
-                sql = "SELECT * FROM reports WHERE content != '' AND DATE(created_at) = %s ORDER BY id ASC;"
-                cur.execute(sql, (today,))
+                # 只获取今日、内容不为空且尚未发布的数据
+                # 使用范围条件而非 DATE(created_at)，以便命中 (created_at, id) 索引
+                sql = (
+                    "SELECT id, content FROM reports "
+                    "WHERE content <> '' AND created_at >= %s AND created_at < %s + INTERVAL 1 DAY "
+                    "AND id NOT IN %s ORDER BY id ASC;"
+                )
+                cur.execute(sql, (today, today, tuple(published_ids) or (0,)))
                 results = cur.fetchall()
 
                 new_articles = []
@@ -65,13 +127,14 @@ class ZhihuDBPublisher:
                     for art in results:
                         art_id = str(art.get('id', ''))
 
-                        if art_id and art_id not in published_ids:
+                        if art_id:
                             content = art.get('content', '')
                             if not content.strip():
                                 continue
 
-                            first_line = content.strip().split('\n')[0]
-                            title = first_line.replace('#', '').strip()
+                            # 只取第一行，无需切分全文；仅去掉行首的 Markdown 标题符号
+                            first_line = content.lstrip().partition('\n')[0]
+                            title = first_line.lstrip('#').strip()
 
                             art['title'] = title
                             new_articles.append(art)
@@ -86,13 +149,15 @@ class ZhihuDBPublisher:
 
         except pymysql.OperationalError as e:
             print(f"数据库连接失败：{e}")
+            self._conn = None
             return False
         except Exception as e:
             print(f"获取数据时发生未知错误：{e}")
             return False
-        finally:
-            if 'conn' in locals() and conn.open:
-                conn.close()
+
+    def _wait(self, timeout):
+        """创建使用较短轮询间隔的 WebDriverWait"""
+        return WebDriverWait(self.driver, timeout, poll_frequency=self._POLL_FREQUENCY)
 
     def start_browser(self):
         """启动浏览器并进行登录流程"""
@@ -129,7 +194,15 @@ class ZhihuDBPublisher:
 
         print("正在尝试直接进入创作中心...")
         self.driver.get("https://zhuanlan.zhihu.com/write")
-        time.sleep(3)
+        # 已登录时编辑器一出现就返回；未登录时等到跳转至登录页
+        try:
+            self._wait(10).until(EC.any_of(
+                EC.presence_of_element_located(self._SEL_TITLE),
+                EC.url_contains("signin"),
+                EC.url_contains("passport"),
+            ))
+        except TimeoutException:
+            pass
 
         current_url = self.driver.current_url
 
@@ -141,7 +214,10 @@ class ZhihuDBPublisher:
             print("=" * 60 + "\n")
             input("登录成功后，请按回车键 (Enter) 继续发布 >> ")
             self.driver.get("https://zhuanlan.zhihu.com/write")
-            time.sleep(2)
+            try:
+                self._wait(10).until(EC.presence_of_element_located(self._SEL_TITLE))
+            except TimeoutException:
+                pass
         else:
             print("检测到已登录状态，自动跳过扫码。")
 
@@ -166,35 +242,30 @@ class ZhihuDBPublisher:
 
         try:
             print("正在寻找标题输入框...")
-            title_box = WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'textarea[placeholder*="标题"]'))
+            title_box = self._wait(15).until(
+                EC.presence_of_element_located(self._SEL_TITLE)
             )
             title_box.clear()
             title_box.send_keys(title)
             print("标题已输入")
 
             print("正在粘贴正文内容...")
-            pyperclip.copy(content)
-
-            try:
-                editor_div = self.driver.find_element(By.CSS_SELECTOR, '.DraftEditor-root')
-            except:
-                editor_div = self.driver.find_element(By.CSS_SELECTOR, 'div[contenteditable="true"]')
+            editor_divs = self.driver.find_elements(*self._SEL_EDITOR)
+            if not editor_divs:
+                print("未找到正文编辑器，跳过本篇。")
+                return
+            editor_div = editor_divs[0]
 
             editor_div.click()
-            time.sleep(1)
-
-            ctrl_key = Keys.COMMAND if platform.system() == 'Darwin' else Keys.CONTROL
-            webdriver.ActionChains(self.driver).key_down(ctrl_key).send_keys('v').key_up(ctrl_key).perform()
+            self.driver.execute_script(_PASTE_SCRIPT, editor_div, content)
 
             print("正文已粘贴")
-            time.sleep(2)
 
             # === 自动点击 Markdown 解析确认 ===
             try:
                 print("正在检测 Markdown 解析弹窗...")
-                markdown_confirm_btn = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, "//*[contains(text(), '确认并解析')]"))
+                markdown_confirm_btn = self._wait(5).until(
+                    EC.presence_of_element_located(self._SEL_MARKDOWN_CONFIRM)
                 )
                 self.driver.execute_script("arguments[0].click();", markdown_confirm_btn)
                 print("✅ 已点击 [确认并解析]，Markdown 格式已渲染！")
@@ -206,14 +277,13 @@ class ZhihuDBPublisher:
             # ======================================
 
             print("正在点击发布按钮...")
-            publish_btn = self.driver.find_element(By.XPATH, "//button[contains(text(), '发布')]")
+            publish_btn = self.driver.find_element(*self._SEL_PUBLISH_BTN)
             publish_btn.click()
 
             print("等待确认弹窗...")
-            time.sleep(2)
             try:
-                confirm_btn = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, ".Modal-wrapper button.Button--primary"))
+                confirm_btn = self._wait(5).until(
+                    EC.element_to_be_clickable(self._SEL_MODAL_CONFIRM)
                 )
                 confirm_btn.click()
                 print("已点击确认发布！")
@@ -225,44 +295,101 @@ class ZhihuDBPublisher:
 
         except Exception as e:
             print(f"发布本篇出错: {e}")
-            import traceback
             traceback.print_exc()
 
+    def _ensure_browser(self):
+        """复用已启动的浏览器；浏览器崩溃或窗口被关闭时重新启动"""
+        if self.driver is not None:
+            try:
+                # 一次轻量请求确认浏览器会话仍然可用
+                self.driver.current_url
+                return True
+            except WebDriverException as e:
+                print(f"浏览器会话已失效，重新启动: {e}")
+                try:
+                    self.driver.quit()
+                except WebDriverException:
+                    pass
+                self.driver = None
+        return self.start_browser()
+
+    def stop(self):
+        """请求停止服务，正在进行的等待会立即返回"""
+        self._stop.set()
+        self._new_article.set()
+
+    def notify_new_article(self):
+        """通知有新文章入库，提前结束本轮的轮询休息（发布间隔不受影响）"""
+        self._new_article.set()
+
     def run(self):
         print("🚀 服务已启动，将持续运行...")
 
-        while True:
-            print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] 开始执行检查任务...")
+        prefetch_future = None
+        try:
+            while not self._stop.is_set():
+                print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] 开始执行检查任务...")
+
+                # 1. 尝试获取【当日】新数据（上一轮休息期间已预取的直接取结果）
+                if prefetch_future is not None:
+                    has_new = prefetch_future.result()
+                    prefetch_future = None
+                else:
+                    has_new = self.fetch_daily_articles()
 
-            # 1. 尝试获取【当日】新数据
-            if self.fetch_daily_articles():
-                # 2. 有数据则启动浏览器
-                if self.start_browser():
+                # 2. 有数据则发布；浏览器只在首次需要时启动，之后各批次复用
+                if has_new and self._ensure_browser():
                     total = len(self.article_list)
                     print(f"\n开始批量发布，本次待处理共 {total} 篇\n")
 
                     for index, article in enumerate(self.article_list):
                         print(f"\n-------- 正在执行第 {index + 1} / {total} 篇 --------")
+                        # 两篇之间休息期间浏览器也可能被关闭，发布前再确认一次
+                        if index > 0 and not self._ensure_browser():
+                            break
                         self.publish_one_article(article)
 
                         # 只要不是最后一条，每发完一条都休息5分钟
                         if index < total - 1:
                             print("等待 5 分钟后发布下一篇...")
-                            time.sleep(300)
+                            if self._stop.wait(300):
+                                break
 
                     print("\n✅ 本批次任务执行完毕！")
 
-                    if self.driver:
-                        self.driver.quit()
-                        self.driver = None
-
-            # 3. 无论是发完了所有文章，还是这次没查到文章，都统一休息5分钟再进行下一次检查
-            print("😴 本轮结束，休息 5 分钟后重新检查数据库...")
-            time.sleep(300)
+                # 3. 无论是发完了所有文章，还是这次没查到文章，都统一休息5分钟再进行下一次检查
+                #    临近休息结束时在后台线程预取下一批数据，与剩余的等待时间重叠
+                print("😴 本轮结束，休息 5 分钟后重新检查数据库...")
+                woken = self._new_article.wait(self._REST_SECONDS - self._PREFETCH_LEAD_SECONDS)
+                if not woken and not self._stop.is_set():
+                    prefetch_future = self._executor.submit(self.fetch_daily_articles)
+                    woken = self._new_article.wait(self._PREFETCH_LEAD_SECONDS)
+                self._new_article.clear()
+                if self._stop.is_set():
+                    break
+                if woken:
+                    # 收到新文章通知：不使用可能早于通知的预取结果，下一轮重新查询
+                    print("📬 收到新文章通知，提前开始检查...")
+                    if prefetch_future is not None:
+                        prefetch_future.result()
+                        prefetch_future = None
+        finally:
+            # 等待进行中的预取结束，再关闭它可能正在使用的数据库连接
+            self._executor.shutdown(wait=True)
+            if self._record_fp is not None:
+                self._record_fp.close()
+                self._record_fp = None
+            if self._conn is not None and self._conn.open:
+                self._conn.close()
+                self._conn = None
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
 
 
 if __name__ == "__main__":
     app = ZhihuDBPublisher(DB_CONFIG)
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.stop())
     try:
         app.run()
     except KeyboardInterrupt:
@@ -1,16 +1,25 @@
 """
 Twitter publisher - publishes tweets to Twitter
 """
+import mimetypes
+import os
 import time
 from typing import Callable, List, Optional
 
+import requests
 import tweepy
+from requests.adapters import HTTPAdapter
 from tweepy.errors import TooManyRequests
 
 from utils import get_logger
 
 logger = get_logger("TwitterPublisher")
 
+# Media larger than this (and any video) goes through chunked INIT/APPEND/FINALIZE upload
+_CHUNKED_UPLOAD_THRESHOLD = 5 * 1024 * 1024
+# Read buffer for chunked uploads
+_UPLOAD_READ_BUFFER = 1024 * 1024
+
 
 class TwitterPublisher:
     """Publishes content to Twitter"""
@@ -23,6 +32,10 @@ class TwitterPublisher:
         access_secret: str,
         bearer_token: str = None
     ):
+        # Shared keep-alive session so consecutive requests reuse the TLS connection
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0))
+
         # Initialize Twitter API v2 client
         self.client = tweepy.Client(
             bearer_token=bearer_token,
@@ -31,13 +44,20 @@ class TwitterPublisher:
             access_token=access_token,
             access_token_secret=access_secret
         )
+        self.client.session = self.session
         
         # Initialize API v1.1 for media upload
         auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_secret)
         self.api_v1 = tweepy.API(auth)
+        self.api_v1.session = self.session
         self._rate_limit_max_retries = 4
         self._rate_limit_min_wait = 5  # seconds
         self._rate_limit_max_wait = 300  # seconds
+        # Exponential backoff per attempt (5s, 10s, 20s, ...), capped at max wait
+        self._backoff_table = [
+            min(self._rate_limit_min_wait * (1 << i), self._rate_limit_max_wait)
+            for i in range(self._rate_limit_max_retries)
+        ]
 
     def _execute_with_rate_limit(
         self,
@@ -74,17 +94,13 @@ class TwitterPublisher:
         headers = getattr(response, "headers", {}) or {}
         reset_ts = headers.get("x-rate-limit-reset")
 
-        if reset_ts:
-            try:
-                reset_seconds = int(reset_ts) - int(time.time())
-                if reset_seconds > 0:
-                    return min(max(reset_seconds, self._rate_limit_min_wait), self._rate_limit_max_wait)
-            except (TypeError, ValueError):
-                pass
+        if reset_ts and reset_ts.isdigit():
+            reset_seconds = int(reset_ts) - int(time.time())
+            if reset_seconds > 0:
+                return min(max(reset_seconds, self._rate_limit_min_wait), self._rate_limit_max_wait)
 
-        # Fallback to exponential backoff (5s, 10s, 20s, ...)
-        wait_seconds = self._rate_limit_min_wait * (2 ** (attempt - 1))
-        return min(wait_seconds, self._rate_limit_max_wait)
+        # Fallback to exponential backoff
+        return self._backoff_table[attempt - 1]
 
     def _log_rate_limit_headers(self, error: TooManyRequests, action: str) -> None:
         response = getattr(error, "response", None)
@@ -111,7 +127,7 @@ class TwitterPublisher:
         try:
             media_id = None
             if media_path:
-                media = self.api_v1.media_upload(media_path)
+                media = self._upload_media(media_path)
                 media_id = media.media_id
             
             response = self._execute_with_rate_limit(
@@ -132,6 +148,27 @@ class TwitterPublisher:
             logger.error(f"Failed to post tweet: {e}")
             return None
     
+    def _upload_media(self, media_path: str):
+        """Upload media, streaming large files and videos in chunks"""
+        mime_type = mimetypes.guess_type(media_path)[0] or ""
+        is_video = mime_type.startswith("video/")
+        if not is_video and os.path.getsize(media_path) <= _CHUNKED_UPLOAD_THRESHOLD:
+            return self.api_v1.media_upload(media_path)
+
+        if is_video:
+            media_category = "tweet_video"
+        elif mime_type == "image/gif":
+            media_category = "tweet_gif"
+        else:
+            media_category = "tweet_image"
+        with open(media_path, "rb", buffering=_UPLOAD_READ_BUFFER) as media_file:
+            return self.api_v1.media_upload(
+                media_path,
+                file=media_file,
+                chunked=True,
+                media_category=media_category,
+            )
+
     def post_thread(self, tweets: List[str]) -> List[str]:
         """
         Post a Twitter thread
@@ -5,19 +5,25 @@
 """
 
 import os
-import time
 import asyncio
+import hashlib
+import json
 import logging
 import random
+import signal
+import string
+import time
 import uuid
+import weakref
+from functools import cached_property
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-import requests
+import aiohttp
 from urllib.parse import urlparse
 import re
 
 try:
-    from playwright.async_api import async_playwright, Browser, Page, BrowserContext, Locator
+    from playwright.async_api import async_playwright, Browser, Page, BrowserContext, ElementHandle, Locator
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
@@ -25,6 +31,539 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 常见遮挡元素（直接移除），合并成一个选择器一次查询
+_BLOCKING_SELECTORS_JOINED = ', '.join((
+    # 弹窗和模态框
+    'div.d-popover', '.modal-overlay', '.popup-overlay',
+    '[role="dialog"]', '.dialog', '.modal',
+    # 提示和通知
+    '.toast', '.notification', '.alert', '.message',
+    # 小红书特定的遮挡元素
+    '.guide-mask', '.tutorial-overlay', '.intro-overlay',
+    '.tips-popup', '.help-popup',
+))
+
+# 遮挡元素上的关闭按钮（点击关闭），只匹配可见的按钮
+_CLOSE_BUTTON_SELECTORS_JOINED = ', '.join(f'{s}:visible' for s in (
+    '.close-btn', '.close-button', '[aria-label="关闭"]',
+    'button[title="关闭"]', '.icon-close',
+))
+
+# 支持的图片扩展名
+_IMG_EXTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# 图片下载的分块大小（64KB），避免整张图片驻留内存
+_DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+# 发布页就绪判断用的标题/内容输入框选择器（合并为一个CSS选择器）
+_PUBLISH_TITLE_WAIT_SELECTOR = ', '.join((
+    'textarea[placeholder*="输入标题"]',
+    'input[placeholder*="标题"]',
+    'input[placeholder*="title"]',
+    '.title-input',
+    '[data-testid="title-input"]',
+))
+_PUBLISH_CONTENT_WAIT_SELECTOR = ', '.join((
+    'div.tiptap.ProseMirror[contenteditable="true"]',
+    'textarea[placeholder*="内容"]',
+    'div[contenteditable="true"]',
+    '.content-editor',
+))
+
+# 图片上传输入框选择器，按优先级排列（第一个为Go版本使用的选择器）
+_UPLOAD_INPUT_SELECTORS = (
+    '.upload-input',
+    'input[type="file"]',
+    'input[accept*="image"]',
+    '.upload-area input[type="file"]',
+    '.file-input',
+)
+
+# 句子边界（中英文句末标点和换行之后）
+_SENTENCE_END_RE = re.compile(r'(?<=[。！？!?；;\n.])')
+
+# "新的创作"按钮的多种选择器（长文模式），按优先级排列
+_NEW_CREATION_SELECTORS = (
+    # 基于用户提供的HTML结构
+    'button:has-text("新的创作")',
+    'button[class*="new-btn"]:has-text("新的创作")',
+    'button[data-v-52f51a04]:has-text("新的创作")',
+    
+    # 通用选择器
+    'button:has-text("创作")',
+    'button:has-text("写长文")',
+    'button:has-text("发布")',
+    
+    # CSS类选择器
+    'button.new-btn',
+    'button[class*="new"]',
+    'button[class*="create"]',
+    'button[class*="publish"]',
+    
+    # 包含SVG图标的按钮
+    'button:has(svg)',
+    'button:has(span:has-text("新的创作"))',
+    
+    # 更具体的选择器
+    'div[class*="summary-content"] button',
+    'div[class*="content"] button:first-child',
+)
+# 等待用的选择器组只匹配可见元素，避免第一个匹配是隐藏按钮时一直等到超时
+_NEW_CREATION_SELECTOR_GROUP = ', '.join(f'{s}:visible' for s in _NEW_CREATION_SELECTORS)
+
+# 『一键排版』按钮候选选择器
+_LAYOUT_BUTTON_SELECTORS = (
+    # 基于用户提供的HTML结构
+    'button:has-text("一键排版")',
+    'button[class*="d-button"][class*="next-btn"]:has-text("一键排版")',
+    'button[class*="custom-button"][class*="bg-red"]:has-text("一键排版")',
+    'span[class*="next-btn-text"]:has-text("一键排版")',
+    'div.footer button:has-text("一键排版")',
+    # 原有选择器
+    'button[title*="排版"]',
+    '.layout-btn',
+    '.format-btn',
+)
+
+# 『下一步』按钮候选选择器
+_NEXT_BUTTON_SELECTORS = (
+    # 基于用户提供的HTML结构
+    'button:has-text("下一步")',
+    'button[class*="d-button-large"][class*="submit"]:has-text("下一步")',
+    'button[class*="d-button"][class*="--color-bg-primary"]:has-text("下一步")',
+    'span[class*="d-text"]:has-text("下一步")',
+    'div.footer button:has-text("下一步")',
+    # 原有选择器
+    'button:has-text("继续")',
+    'button:has-text("Next")',
+    '.next-btn',
+    '.continue-btn',
+)
+
+# 发布按钮候选选择器（按优先级排列）
+_PUBLISH_BUTTON_SELECTORS = (
+    # 基于用户提供的HTML结构
+    'button[class*="publishBtn"]:has-text("发布")',
+    'button[class*="d-button-large"][class*="red"]:has-text("发布")',
+    'button[data-impression*="note_compose_target"]:has-text("发布")',
+    'div.submit button:has-text("发布")',
+    'span[class*="d-text"]:has-text("发布")',
+    # 原有选择器
+    'div.submit div.d-button-content',  # Go版本使用的选择器
+    'button:has-text("发布")',
+    'button:has-text("发表")',
+    'div.submit button',
+    'button[class*="submit"]',
+    # 长文模式额外选择器
+    'button:has-text("发布笔记")',
+    'button:has-text("立即发布")',
+    'button:has-text("确认发布")',
+    'button[type="submit"]',
+    '.publish-btn',
+    '.submit-btn',
+)
+
+# 按可访问名称查找发布按钮的回退匹配
+_PUBLISH_BTN_RE = re.compile("(发布|确认发布|立即发布)")
+_PUBLISH_BTN_XPATH = 'xpath=//span[contains(normalize-space(.), "发布")]/ancestor::button[1]'
+
+# 点击发布按钮前的准备：滚动到视图中央并派发mouseover（代替hover），
+# 再等待disabled/aria-disabled解除，属性变化时立即返回，3秒超时后返回当前状态
+_PREPARE_PUBLISH_CLICK_JS = """
+el => new Promise(resolve => {
+    el.scrollIntoView({block: 'center'});
+    el.dispatchEvent(new MouseEvent('mouseover', {bubbles: true}));
+    const enabled = () => !(el.disabled || el.hasAttribute('disabled') || el.getAttribute('aria-disabled') === 'true');
+    if (enabled()) return resolve(true);
+    const observer = new MutationObserver(() => {
+        if (enabled()) { observer.disconnect(); resolve(true); }
+    });
+    observer.observe(el, {attributes: true, attributeFilter: ['disabled', 'aria-disabled', 'class']});
+    setTimeout(() => { observer.disconnect(); resolve(enabled()); }, 3000);
+})
+"""
+
+# 判断发布页可复用：上传区域存在，且没有上一次发布残留的图片预览、标题或正文
+_WARM_PAGE_CLEAN_JS = """
+([titleSel, contentSel]) => {
+    if (!document.querySelector('div.upload-content')) return false;
+    if (document.querySelector('.img-preview-area .pr')) return false;
+    for (const el of document.querySelectorAll(titleSel)) {
+        if ((el.value || '').trim()) return false;
+    }
+    for (const el of document.querySelectorAll(contentSel)) {
+        const text = el.value !== undefined ? el.value : el.textContent;
+        if ((text || '').trim()) return false;
+    }
+    return true;
+}
+"""
+
+# 常见编辑器元素，合并为一个CSS选择器组
+_EDITOR_SELECTOR = ', '.join((
+    'textarea[placeholder*="输入标题"]',
+    'div[contenteditable="true"]',
+    '.editor',
+    '.tiptap',
+    'textarea',
+    'input[placeholder*="标题"]',
+))
+
+# 发布成功指示器，合并为一个只匹配可见元素的选择器组
+_SUCCESS_INDICATOR_SELECTOR = ', '.join((
+    ':text("发布成功"):visible',
+    ':text("发表成功"):visible',
+    ':text("提交成功"):visible',
+    ':text("已发布"):visible',
+))
+
+# 每次发布的随机停顿预算（秒），用完后步骤间只保留极短的停顿
+_JITTER_BUDGET = 8.0
+
+# 模拟打错字时使用的字符
+_ALPHA = string.ascii_lowercase
+
+# 打字模式：短文本(<=10) / 中等文本(<=50) / 长文本
+_TYPING_PATTERNS = (
+    {
+        'base_delay': (5, 15),  # 短文本，非常快
+        'pause_probability': 0.05,
+        'pause_delay': (0.02, 0.08),
+        'thinking_interval': 12,
+        'thinking_delay': (0.05, 0.15)
+    },
+    {
+        'base_delay': (8, 20),  # 中等文本，快速
+        'pause_probability': 0.08,
+        'pause_delay': (0.05, 0.12),
+        'thinking_interval': 20,
+        'thinking_delay': (0.08, 0.2)
+    },
+    {
+        'base_delay': (10, 25),  # 长文本，流畅快速
+        'pause_probability': 0.1,
+        'pause_delay': (0.08, 0.2),
+        'thinking_interval': 30,
+        'thinking_delay': (0.1, 0.3)
+    },
+)
+
+# 在页面内执行simulate_typing_errors生成的打字动作（一次evaluate），
+# 停顿节奏与_type_actions一致；富文本用execCommand插入，输入框逐步设置value并派发input事件
+_TYPE_ACTIONS_IN_PAGE_JS = """
+async ([selector, actions, p]) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    el.focus();
+    
+    const editable = el.isContentEditable;
+    const setValue = editable ? null : Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set;
+    const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+    const rand = ([a, b]) => a + Math.random() * (b - a);
+    
+    const insert = (text) => {
+        if (editable) return document.execCommand('insertText', false, text);
+        setValue.call(el, el.value + text);
+        el.dispatchEvent(new InputEvent('input', {bubbles: true, data: text, inputType: 'insertText'}));
+    };
+    const backspace = () => {
+        if (editable) return document.execCommand('delete');
+        setValue.call(el, el.value.slice(0, -1));
+        el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'deleteContentBackward'}));
+    };
+    
+    for (let i = 0; i < actions.length; i++) {
+        const [kind, payload] = actions[i];
+        if (kind === 'type') {
+            insert(payload);
+            await sleep(rand(p.base_delay));
+            if (Math.random() < p.pause_probability) await sleep(rand(p.pause_delay) * 1000);
+            if (i > 0 && i % p.thinking_interval === 0) await sleep(rand(p.thinking_delay) * 1000);
+        } else if (kind === 'backspace') {
+            backspace();
+            await sleep(100 + Math.random() * 100);
+        } else if (kind === 'pause') {
+            await sleep(payload * 1000);
+        }
+    }
+    return true;
+}
+"""
+
+# 发布页可交互的标志：图文模式的上传区域 / 长文模式的"新的创作"按钮或编辑器
+_PUBLISH_ROOT_SELECTOR = 'div.upload-content, button:has-text("新的创作"), div[contenteditable="true"]'
+
+# 在页面内查找文本为name的发布标签页（div.creator-tab）：要求可见、未被样式隐藏、在视口内，
+# 滚动到目标后返回中心坐标以及中心点是否被其他元素遮挡；找不到返回null
+_FIND_CREATOR_TAB_JS = """
+(name) => {
+    for (const tab of document.querySelectorAll('div.creator-tab')) {
+        // 检查元素是否可见
+        if (!(tab.offsetWidth || tab.offsetHeight || tab.getClientRects().length)) continue;
+        
+        // 检查元素是否被隐藏（通过style属性）
+        const style = tab.getAttribute('style') || '';
+        if (style.includes('left: -9999px') || style.includes('position: absolute')) continue;
+        
+        // 检查元素是否在视口内
+        let rect = tab.getBoundingClientRect();
+        if (rect.x < 0 || rect.y < 0) continue;
+        
+        if ((tab.textContent || '').trim() !== name) continue;
+        
+        // 滚动到元素位置
+        tab.scrollIntoView({block: 'nearest'});
+        rect = tab.getBoundingClientRect();
+        const x = rect.x + rect.width / 2, y = rect.y + rect.height / 2;
+        const hit = document.elementFromPoint(x, y);
+        return {x, y, blocked: !!hit && hit !== tab && !tab.contains(hit)};
+    }
+    return null;
+}
+"""
+
+# 按顺序找出第一个可见的元素（每个选择器只看第一个匹配，与query_selector一致），
+# 滚动到视图内后返回命中的选择器、标签名和边界框；都不可见时返回null
+_FIND_FIRST_VISIBLE_JS = """
+(selectors) => {
+    for (const selector of selectors) {
+        const el = document.querySelector(selector);
+        if (!el || !(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) continue;
+        
+        el.scrollIntoView({block: 'nearest'});
+        const rect = el.getBoundingClientRect();
+        return {
+            selector,
+            tag: el.tagName.toLowerCase(),
+            x: rect.x, y: rect.y, width: rect.width, height: rect.height
+        };
+    }
+    return null;
+}
+"""
+
+# 按顺序找出第一个可见且未禁用的元素（检查每个选择器的所有匹配），直接返回元素；
+# Playwright的:has-text()不是标准CSS，拆成CSS部分和文本包含条件
+_FIND_FIRST_ENABLED_JS = """
+(selectors) => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const enabled = (el) => !(el.disabled || el.hasAttribute('disabled') || el.getAttribute('aria-disabled') === 'true');
+    for (const selector of selectors) {
+        const m = selector.match(/^(.*):has-text\\("([^"]*)"\\)$/);
+        const css = m ? (m[1] || '*') : selector;
+        const text = m ? m[2] : null;
+        let els;
+        try { els = document.querySelectorAll(css); } catch (e) { continue; }
+        for (const el of els) {
+            if (text !== null && !(el.textContent || '').includes(text)) continue;
+            if (visible(el) && enabled(el)) return el;
+        }
+    }
+    return null;
+}
+"""
+
+# 找出元素命中的第一个选择器（与_FIND_FIRST_ENABLED_JS的匹配规则一致），返回其下标
+_MATCHED_SELECTOR_INDEX_JS = """
+(el, selectors) => selectors.findIndex((selector) => {
+    const m = selector.match(/^(.*):has-text\\("([^"]*)"\\)$/);
+    const css = m ? (m[1] || '*') : selector;
+    try {
+        return el.matches(css) && (!m || (el.textContent || '').includes(m[2]));
+    } catch (e) {
+        return false;
+    }
+})
+"""
+
+# 按钮选择器命中缓存的有效期（秒）
+_BUTTON_HIT_TTL = 3600
+
+# 标题输入框候选选择器（按优先级排列，已去重）
+_TITLE_SELECTORS = (
+    # 长文模式优先选择器（参考备份文件）
+    'textarea[placeholder*="输入标题"]',
+    'textarea.d-text[placeholder*="输入标题"]',
+    'input[placeholder*="标题"]',
+    'input[placeholder*="title"]',
+    'input[placeholder*="Title"]',
+    'input[placeholder*="请输入标题"]',
+    '.title-input',
+    '[data-testid="title-input"]',
+    'textarea[placeholder*="标题"]',
+    'input[type="text"]:first-of-type',
+    'input[type="text"]',
+    
+    # 图文模式选择器
+    'div.d-input input',  # Go版本使用的选择器
+    
+    # 通用选择器
+    '[contenteditable="true"]',
+    '.note-title',
+    '.title-editor',
+    'textarea:not([style*="display: none"])',
+    'input:not([style*="display: none"])',
+    
+    # 更广泛的选择器
+    'textarea',
+)
+
+# 正文输入框候选选择器（按优先级排列）
+_CONTENT_SELECTORS = (
+    # 图文模式选择器
+    'div.ql-editor',  # Go版本首选的选择器
+    'p[data-placeholder*="输入正文描述"]',  # Go版本的备选选择器
+    
+    # 长文模式选择器（参考备份文件）
+    'div.tiptap.ProseMirror[contenteditable="true"]',  # 富文本编辑器
+    'textarea[placeholder*="内容"]',
+    'textarea[placeholder*="content"]',
+    'textarea[placeholder*="正文"]',
+    'textarea[placeholder*="文本"]',
+    'textarea[placeholder*="输入"]',
+    'textarea[placeholder*="写点什么"]',
+    'textarea[placeholder*="分享"]',
+    'textarea[placeholder*="小红书"]',
+    'textarea[placeholder*="笔记"]',
+    
+    # 通用选择器
+    'div[contenteditable="true"]',
+    '[contenteditable="true"]',
+    '.content-editor',
+    '.note-editor',
+    '.text-editor',
+    '.editor',
+    'textarea:not([style*="display: none"])',
+    'div[contenteditable]:not([style*="display: none"])',
+)
+
+# 本进程已创建过的目录，避免每次构造发布器都重复mkdir
+_ensured_dirs: set = set()
+
+
+def _ensure_dir(path: Path) -> Path:
+    """确保目录存在（每个目录每个进程只mkdir一次）"""
+    if path not in _ensured_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(path)
+    return path
+
+# 进程内共享一个Playwright驱动和Browser（按headless区分），每个用户只创建独立的BrowserContext
+# 这些对象绑定在创建它们的事件循环上，_shared_loop记录该循环
+_shared_playwright = None
+_shared_browsers: Dict[bool, "Browser"] = {}
+_shared_lock: Optional[asyncio.Lock] = None
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+# 仍在使用共享浏览器的发布器数量，归零时关闭Browser和驱动
+_shared_refs = 0
+# 每次重建共享对象时递增，旧循环上的发布器释放时不影响新的引用计数
+_shared_generation = 0
+
+
+async def _close_shared_objects(browsers: List["Browser"], playwright) -> None:
+    """关闭给定的Browser和Playwright驱动"""
+    for browser in browsers:
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug(f"关闭共享浏览器失败: {e}")
+    if playwright is not None:
+        try:
+            await playwright.stop()
+        except Exception as e:
+            logger.debug(f"停止Playwright驱动失败: {e}")
+
+
+def _kill_playwright_driver(playwright) -> None:
+    """旧事件循环已结束、无法再await时，直接结束驱动进程（它启动的Chromium随之退出）"""
+    try:
+        proc = playwright._connection._transport._proc
+        if proc.returncode is None:
+            os.kill(proc.pid, signal.SIGTERM)
+    except Exception as e:
+        logger.debug(f"结束Playwright驱动进程失败: {e}")
+
+
+def _reset_shared_if_loop_changed():
+    """事件循环变化时（如每次发布都调用asyncio.run）关闭旧循环上的驱动和Browser，并重建Lock"""
+    global _shared_playwright, _shared_lock, _shared_loop, _shared_refs, _shared_generation
+    loop = asyncio.get_running_loop()
+    if _shared_loop is loop:
+        return
+    
+    old_loop = _shared_loop
+    if _shared_playwright is not None:
+        logger.debug("事件循环已变化，关闭旧的共享浏览器")
+        if old_loop is not None and not old_loop.is_closed() and old_loop.is_running():
+            # 旧循环仍在其他线程运行：交给它关闭
+            asyncio.run_coroutine_threadsafe(
+                _close_shared_objects(list(_shared_browsers.values()), _shared_playwright), old_loop
+            )
+        else:
+            _kill_playwright_driver(_shared_playwright)
+    
+    _shared_playwright = None
+    _shared_browsers.clear()
+    _shared_lock = asyncio.Lock()
+    _shared_loop = loop
+    _shared_refs = 0
+    _shared_generation += 1
+
+
+async def _get_shared_browser(headless: bool, args: List[str]) -> Tuple["Browser", int]:
+    """获取（必要时启动）共享的Browser并增加引用计数，返回Browser和当前代号"""
+    global _shared_playwright, _shared_refs
+    _reset_shared_if_loop_changed()
+    
+    async with _shared_lock:
+        if _shared_playwright is None:
+            _shared_playwright = await async_playwright().start()
+        
+        browser = _shared_browsers.get(headless)
+        if browser is None or not browser.is_connected():
+            browser = await _shared_playwright.chromium.launch(headless=headless, args=args)
+            _shared_browsers[headless] = browser
+        _shared_refs += 1
+        return browser, _shared_generation
+
+
+async def _release_shared_browser(generation: int):
+    """释放一次共享浏览器引用，最后一个使用者释放时关闭Browser和驱动"""
+    global _shared_refs
+    _reset_shared_if_loop_changed()
+    if generation != _shared_generation:
+        # 引用属于已经重建前的共享对象，旧对象已在重建时关闭
+        return
+    
+    async with _shared_lock:
+        _shared_refs = max(0, _shared_refs - 1)
+        if _shared_refs == 0:
+            await _close_shared_browser_locked()
+
+
+async def close_shared_browser():
+    """关闭共享的Browser和Playwright驱动（最后一个发布器关闭时自动关闭，也可在进程退出前强制调用）"""
+    _reset_shared_if_loop_changed()
+    async with _shared_lock:
+        await _close_shared_browser_locked()
+
+
+async def _close_shared_browser_locked():
+    """关闭共享对象并清零引用计数（调用方持有_shared_lock）"""
+    global _shared_playwright, _shared_refs
+    browsers = list(_shared_browsers.values())
+    _shared_browsers.clear()
+    playwright, _shared_playwright = _shared_playwright, None
+    _shared_refs = 0
+    await _close_shared_objects(browsers, playwright)
+
+def _finalize_context(loop: asyncio.AbstractEventLoop, context: "BrowserContext"):
+    """发布器被回收而上下文未关闭时，尽力在创建它的事件循环上关闭上下文"""
+    if loop.is_closed() or not loop.is_running():
+        # 事件循环已结束（通常是解释器退出），Chromium随Playwright驱动进程一起退出
+        return
+    asyncio.run_coroutine_threadsafe(context.close(), loop)
+
 class HumanBehaviorSimulator:
     """真人行为模拟器"""
     
@@ -127,102 +666,117 @@ class HumanBehaviorSimulator:
         # 根据距离决定路径点数量
         num_points = max(3, min(8, int(distance / 50)))
         
-        path = [(start_x, start_y)]
-        
-        for i in range(1, num_points):
-            # 线性插值
-            t = i / num_points
-            linear_x = start_x + (end_x - start_x) * t
-            linear_y = start_y + (end_y - start_y) * t
-            
-            # 添加随机偏移，模拟人类不完美的鼠标移动
-            offset_range = min(20, distance * 0.1)
-            offset_x = random.uniform(-offset_range, offset_range)
-            offset_y = random.uniform(-offset_range, offset_range)
-            
-            path.append((linear_x + offset_x, linear_y + offset_y))
+        # 每段的位移与随机偏移范围只需计算一次
+        step_x = (end_x - start_x) / num_points
+        step_y = (end_y - start_y) / num_points
+        offset_range = min(20, distance * 0.1)
+        uniform = random.uniform
         
+        # 线性插值 + 随机偏移，模拟人类不完美的鼠标移动
+        path = [(start_x, start_y)]
+        path.extend(
+            (start_x + step_x * i + uniform(-offset_range, offset_range),
+             start_y + step_y * i + uniform(-offset_range, offset_range))
+            for i in range(1, num_points)
+        )
         path.append((end_x, end_y))
         return path
     
     @staticmethod
     def get_typing_pattern(text_length: int) -> dict:
         """
-        根据文本长度生成打字模式
+        根据文本长度生成打字模式（返回共享的常量字典，调用方不要修改）
         """
         if text_length <= 10:
-            return {
-                'base_delay': (5, 15),  # 短文本，非常快
-                'pause_probability': 0.05,
-                'pause_delay': (0.02, 0.08),
-                'thinking_interval': 12,
-                'thinking_delay': (0.05, 0.15)
-            }
+            return _TYPING_PATTERNS[0]
         elif text_length <= 50:
-            return {
-                'base_delay': (8, 20),  # 中等文本，快速
-                'pause_probability': 0.08,
-                'pause_delay': (0.05, 0.12),
-                'thinking_interval': 20,
-                'thinking_delay': (0.08, 0.2)
-            }
+            return _TYPING_PATTERNS[1]
         else:
-            return {
-                'base_delay': (10, 25),  # 长文本，流畅快速
-                'pause_probability': 0.1,
-                'pause_delay': (0.08, 0.2),
-                'thinking_interval': 30,
-                'thinking_delay': (0.1, 0.3)
-            }
+            return _TYPING_PATTERNS[2]
     
     @staticmethod
-    def simulate_typing_errors(text: str, error_rate: float = 0.02) -> List[dict]:
+    def simulate_typing_errors(text: str, error_rate: float = 0.02) -> List[Tuple[str, object]]:
         """
         模拟打字错误和修正
+        返回 (kind, payload) 元组列表：('type', 字符) / ('pause', 秒数) / ('backspace', None)
         """
         actions = []
         
+        # 一次性抽取出错位置和错误字符，避免逐字符调用random
+        error_count = int(len(text) * error_rate)
+        error_positions = set(random.sample(range(len(text)), k=error_count))
+        wrong_chars = iter(random.choices(_ALPHA, k=error_count))
+        
         for i, char in enumerate(text):
             # 正常输入字符
-            actions.append({'type': 'type', 'char': char})
+            actions.append(('type', char))
             
             # 随机打字错误
-            if random.random() < error_rate:
+            if i in error_positions:
                 # 输入错误字符
-                wrong_char = random.choice('abcdefghijklmnopqrstuvwxyz')
-                actions.append({'type': 'type', 'char': wrong_char})
+                actions.append(('type', next(wrong_chars)))
                 
                 # 暂停（发现错误）
-                actions.append({'type': 'pause', 'duration': random.uniform(0.2, 0.5)})
+                actions.append(('pause', random.uniform(0.2, 0.5)))
                 
                 # 删除错误字符
-                actions.append({'type': 'backspace'})
+                actions.append(('backspace', None))
                 
                 # 再次暂停（重新思考）
-                actions.append({'type': 'pause', 'duration': random.uniform(0.1, 0.3)})
+                actions.append(('pause', random.uniform(0.1, 0.3)))
         
         return actions
 
 class RealXHSPublisher:
     """小红书MCP共享浏览器发布器"""
     
-    def __init__(self, user_id: str = "default", headless: bool = False, auto_close: bool = False, use_system_profile: bool = False):
+    def __init__(self, user_id: str = "default", headless: bool = False, auto_close: bool = False, use_system_profile: bool = False, debug_dom: bool = False, paranoid_typing: bool = False):
         self.user_id = user_id
         self.headless = headless
         self.auto_close = auto_close
+        # 是否输出页面DOM结构分析（仅调试用）
+        self.debug_dom = debug_dom
+        # 是否逐字符模拟打字（默认按句子分段insert_text）
+        self.paranoid_typing = paranoid_typing
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.playwright = None
+        # 获取共享浏览器时的代号，释放引用时使用
+        self._shared_generation = 0
+        self._http: Optional[aiohttp.ClientSession] = None
+        # 当前页面的CDP会话（热点循环直接走Runtime.evaluate）
+        self._cdp = None
+        # 最近一次鼠标位置，用作下一段鼠标轨迹的起点
+        self._last_mouse: Tuple[float, float] = (0.0, 0.0)
+        # 上次命中的输入框选择器（按 输入框:发布模式 区分），下次优先尝试
+        self._selector_hits: Dict[str, str] = {}
+        # 上次命中的按钮选择器：(域名, 按钮名) -> (选择器, 记录时间)，1小时内优先尝试
+        self._button_hits: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # 上下文的兜底清理（weakref.finalize），close_browser时解除
+        self._finalizer: Optional[weakref.finalize] = None
+        # 上次命中的图片上传输入框选择器，下次优先尝试
+        self._upload_input_sel: Optional[str] = None
+        # 上一次完成导航的图文发布页，下次发布时若仍可用则跳过goto
+        self._warm_page: Optional[Page] = None
+        # 本次发布剩余的随机停顿预算
+        self._jitter_budget = _JITTER_BUDGET
+        # 浏览器启动时选定的视口大小
+        self._viewport: Optional[Dict[str, int]] = None
+        # 已下载图片缓存：URL -> 本地路径，重复发布时跳过下载
+        self._image_cache: Dict[str, str] = {}
         
         # 使用MCP共享浏览器用户数据目录
-        self.user_data_dir = Path(f"user_data/{user_id}")
-        self.user_data_dir.mkdir(parents=True, exist_ok=True)
+        self.user_data_dir = _ensure_dir(Path(f"user_data/{user_id}"))
         logger.info(f"使用MCP共享浏览器用户数据目录: {self.user_data_dir}")
         
         # 下载目录
-        self.download_dir = Path(f"downloads/{user_id}")
-        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.download_dir = _ensure_dir(Path(f"downloads/{user_id}"))
+    
+    @cached_property
+    def state_path(self) -> str:
+        """登录态文件路径（storage_state），首次访问时计算"""
+        return str(self.user_data_dir / "state.json")
     
     async def random_click(self, selector: str, timeout: int = 30000, retry_count: int = 3) -> bool:
         """
@@ -239,7 +793,7 @@ class RealXHSPublisher:
                 # 检查元素是否被遮挡
                 if await self._is_element_blocked(element):
                     logger.info(f"元素被遮挡，尝试处理遮挡: {selector}")
-                    await self._handle_element_blocking()
+                    await self._handle_element_blocking(element)
                     await asyncio.sleep(random.uniform(0.5, 1.0))
                     continue
                 
@@ -251,30 +805,18 @@ class RealXHSPublisher:
                 
                 # 使用智能坐标生成（模拟真人点击习惯）
                 x, y = HumanBehaviorSimulator.generate_human_click_coordinates(box)
-                
-                # 获取当前鼠标位置（如果可能）
-                current_mouse = await self.page.evaluate("() => ({ x: 0, y: 0 })")  # 简化处理
-                
-                # 生成真实的鼠标移动路径
-                mouse_path = HumanBehaviorSimulator.generate_mouse_path(
-                    current_mouse.get('x', 0), current_mouse.get('y', 0), x, y
-                )
-                
-                # 沿路径移动鼠标
-                for path_x, path_y in mouse_path[:-1]:
-                    await self.page.mouse.move(path_x, path_y)
-                    await asyncio.sleep(random.uniform(0.02, 0.08))  # 路径点之间的小延迟
-                
-                # 最终移动到目标位置
-                await self.page.mouse.move(x, y)
+
+                # 移动到目标位置：由Playwright在驱动端插值中间点，一次调用完成
+                await self.page.mouse.move(x, y, steps=random.randint(5, 10))
                 await asyncio.sleep(HumanBehaviorSimulator.mouse_move_delay())
-                
+
                 # 随机暂停（模拟用户犹豫）
                 if HumanBehaviorSimulator.random_pause():
                     await asyncio.sleep(HumanBehaviorSimulator.hesitation_delay())
                 
                 # 随机坐标点击
                 await self.page.mouse.click(x, y)
+                self._last_mouse = (x, y)
                 logger.info(f"随机坐标点击成功: {selector} at ({x:.1f}, {y:.1f})")
                 
                 # 点击后等待（模拟真人反应时间）
@@ -291,54 +833,33 @@ class RealXHSPublisher:
     async def _is_element_blocked(self, element) -> bool:
         """
         增强的元素遮挡检测
-        检测多个点位，确保元素真正可点击
+        在元素中心做一次命中测试（elementsFromPoint），沿层叠顺序检查目标元素之上是否有遮挡
         """
         try:
-            box = await element.bounding_box()
-            if not box:
-                return True
-            
-            # 检测多个点位：中心、四个角的内侧点
-            test_points = [
-                (box['x'] + box['width'] / 2, box['y'] + box['height'] / 2),  # 中心
-                (box['x'] + box['width'] * 0.25, box['y'] + box['height'] * 0.25),  # 左上
-                (box['x'] + box['width'] * 0.75, box['y'] + box['height'] * 0.25),  # 右上
-                (box['x'] + box['width'] * 0.25, box['y'] + box['height'] * 0.75),  # 左下
-                (box['x'] + box['width'] * 0.75, box['y'] + box['height'] * 0.75),  # 右下
-            ]
-            
-            blocked_count = 0
-            for x, y in test_points:
-                result = await self.page.evaluate(f"""
-                    (targetElement) => {{
-                        const element = document.elementFromPoint({x}, {y});
-                        if (!element) return true;
-                        
-                        // 检查是否是目标元素或其子元素
-                        if (element === targetElement || targetElement.contains(element)) {{
-                            return false;
-                        }}
-                        
-                        // 检查遮挡元素的z-index和opacity
-                        const style = window.getComputedStyle(element);
-                        const zIndex = parseInt(style.zIndex) || 0;
-                        const opacity = parseFloat(style.opacity) || 1;
+            # 边界框与命中测试在同一次evaluate中完成
+            is_blocked = await element.evaluate("""
+                (targetElement) => {
+                    const rect = targetElement.getBoundingClientRect();
+                    if (!rect.width || !rect.height) return true;
+                    
+                    const stack = document.elementsFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+                    for (const node of stack) {
+                        // 先命中目标元素或其子元素，说明没有被遮挡
+                        if (node === targetElement || targetElement.contains(node)) return false;
                         
                         // 如果遮挡元素透明度很低，认为不是真正的遮挡
-                        if (opacity < 0.1) return false;
+                        const opacity = parseFloat(window.getComputedStyle(node).opacity);
+                        if (opacity < 0.1) continue;
                         
                         return true;
-                    }}
-                """, element)
-                
-                if result:
-                    blocked_count += 1
-            
-            # 如果超过一半的点位被遮挡，认为元素被遮挡
-            is_blocked = blocked_count > len(test_points) / 2
+                    }
+                    // 中心点不在视口内
+                    return true;
+                }
+            """)
             
             if is_blocked:
-                logger.info(f"元素被遮挡：{blocked_count}/{len(test_points)} 个检测点被遮挡")
+                logger.info("元素被遮挡：中心点被其他元素覆盖")
             
             return is_blocked
             
@@ -346,7 +867,7 @@ class RealXHSPublisher:
             logger.warning(f"检测元素遮挡状态失败: {e}")
             return False
     
-    async def _handle_element_blocking(self):
+    async def _handle_element_blocking(self, element=None):
         """
         增强的元素遮挡处理机制
         """
@@ -356,8 +877,12 @@ class RealXHSPublisher:
             # 1. 尝试关闭常见的遮挡元素
             await self._close_blocking_elements()
             
-            # 2. 尝试滚动页面，让目标元素完全可见
-            await self._scroll_to_make_visible()
+            # 2. 滚动到目标元素，让其完全可见
+            if element is not None:
+                try:
+                    await element.scroll_into_view_if_needed(timeout=2000)
+                except Exception as e:
+                    logger.debug(f"滚动到目标元素失败: {e}")
             
             # 3. 尝试按ESC键关闭弹窗
             await self.page.keyboard.press('Escape')
@@ -373,57 +898,31 @@ class RealXHSPublisher:
     
     async def _close_blocking_elements(self):
         """关闭常见的遮挡元素"""
-        # 扩展的遮挡元素选择器
-        blocking_selectors = [
-            # 弹窗和模态框
-            'div.d-popover', '.modal-overlay', '.popup-overlay', 
-            '[role="dialog"]', '.dialog', '.modal',
-            
-            # 提示和通知
-            '.toast', '.notification', '.alert', '.message',
-            
-            # 关闭按钮
-            '.close-btn', '.close-button', '[aria-label="关闭"]',
-            'button[title="关闭"]', '.icon-close',
-            
-            # 小红书特定的遮挡元素
-            '.guide-mask', '.tutorial-overlay', '.intro-overlay',
-            '.tips-popup', '.help-popup',
-        ]
-        
-        for selector in blocking_selectors:
-            try:
-                elements = await self.page.query_selector_all(selector)
-                for element in elements:
-                    if await element.is_visible():
-                        # 尝试点击关闭按钮
-                        if 'close' in selector or '关闭' in selector:
-                            await element.click()
-                            logger.info(f"点击关闭按钮: {selector}")
-                        else:
-                            # 移除遮挡元素
-                            await element.evaluate('el => el.remove()')
-                            logger.info(f"移除遮挡元素: {selector}")
-                        
-                        await asyncio.sleep(HumanBehaviorSimulator.click_delay())
-            except:
-                continue
-    
-    async def _scroll_to_make_visible(self):
-        """滚动页面使元素完全可见"""
         try:
-            # 滚动到页面顶部，然后再滚动到目标位置
-            await self.page.evaluate("window.scrollTo(0, 0)")
-            await asyncio.sleep(HumanBehaviorSimulator.mouse_move_delay())
-            
-            # 小幅度随机滚动，模拟用户寻找元素
-            for _ in range(3):
-                scroll_delta = random.randint(-200, 200)
-                await self.page.evaluate(f"window.scrollBy(0, {scroll_delta})")
-                await asyncio.sleep(HumanBehaviorSimulator.mouse_move_delay())
-                
+            # 移除遮挡元素：查询、可见性判断和移除在一次evaluate中完成
+            removed = await self.page.evaluate("""
+                (selector) => {
+                    let removed = 0;
+                    for (const el of document.querySelectorAll(selector)) {
+                        if (el.offsetWidth || el.offsetHeight || el.getClientRects().length) {
+                            el.remove();
+                            removed++;
+                        }
+                    }
+                    return removed;
+                }
+            """, _BLOCKING_SELECTORS_JOINED)
+            if removed:
+                logger.info(f"移除遮挡元素: {removed} 个")
+                await asyncio.sleep(HumanBehaviorSimulator.click_delay())
+            
+            # 尝试点击关闭按钮（可见性在引擎侧过滤，不再逐个is_visible）
+            for element in await self.page.locator(_CLOSE_BUTTON_SELECTORS_JOINED).element_handles():
+                await element.click()
+                logger.info("点击关闭按钮")
+                await asyncio.sleep(HumanBehaviorSimulator.click_delay())
         except Exception as e:
-            logger.warning(f"滚动页面失败: {e}")
+            logger.debug(f"关闭遮挡元素失败: {e}")
     
     async def _click_empty_position(self):
         """
@@ -435,11 +934,84 @@ class RealXHSPublisher:
             y = 20 + random.randint(0, 60)
             
             await self.page.mouse.click(x, y)
+            self._last_mouse = (x, y)
             logger.info(f"点击空白位置: ({x}, {y})")
             
         except Exception as e:
             logger.warning(f"点击空白位置失败: {e}")
     
+    async def _type_actions(self, actions: List[Tuple[str, object]], pattern: dict):
+        """
+        执行simulate_typing_errors生成的打字动作
+        连续的字符合并成一次keyboard.type，只在退格/停顿/定期思考处断开，避免逐字符的CDP往返
+        """
+        buffer = []
+        for i, (kind, payload) in enumerate(actions):
+            if kind == 'type':
+                buffer.append(payload)
+                if i == 0 or i % pattern['thinking_interval']:
+                    continue
+            
+            if buffer:
+                # 使用动态延迟
+                delay = random.uniform(*pattern['base_delay'])
+                await self.page.keyboard.type(''.join(buffer), delay=delay)
+                buffer.clear()
+                
+                # 随机暂停，模拟思考
+                if random.random() < pattern['pause_probability']:
+                    await asyncio.sleep(random.uniform(*pattern['pause_delay']))
+            
+            if kind == 'backspace':
+                await self.page.keyboard.press('Backspace')
+                await asyncio.sleep(random.uniform(0.1, 0.2))
+                
+            elif kind == 'pause':
+                await asyncio.sleep(payload)
+                
+            else:
+                # 定期思考暂停
+                await asyncio.sleep(random.uniform(*pattern['thinking_delay']))
+                
+                # 偶尔分心（按每100字符1%的频率折算到每个思考间隔）
+                if random.random() < 0.01 * pattern['thinking_interval'] / 100:
+                    await asyncio.sleep(HumanBehaviorSimulator.distraction_delay())
+        
+        if buffer:
+            delay = random.uniform(*pattern['base_delay'])
+            await self.page.keyboard.type(''.join(buffer), delay=delay)
+    
+    async def _type_actions_in_page(self, selector: str, actions: List[Tuple[str, object]], pattern: dict) -> bool:
+        """在页面内一次evaluate执行全部打字动作，避免每个按键一次CDP往返；找不到元素时返回False"""
+        return await self.page.evaluate(_TYPE_ACTIONS_IN_PAGE_JS, [selector, actions, pattern])
+    
+    async def _insert_text_chunked(self, text: str):
+        """按句子边界把文本分成3-5段，每段一次insert_text，段间短暂停顿"""
+        if not text:
+            return
+        
+        pieces = [p for p in _SENTENCE_END_RE.split(text) if p]
+        if len(pieces) < 3:
+            # 句子太少时按长度均分
+            size = max(1, -(-len(text) // 3))
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        
+        # 相邻句子合并，使段数不超过5段
+        target = len(text) / min(5, len(pieces))
+        chunks, current = [], ''
+        for piece in pieces:
+            current += piece
+            if len(current) >= target:
+                chunks.append(current)
+                current = ''
+        if current:
+            chunks.append(current)
+        
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(random.uniform(0.2, 0.6))
+            await self.page.keyboard.insert_text(chunk)
+    
     async def human_type(self, selector: str, text: str, delay_range: Tuple[float, float] = None) -> bool:
         """
         高级人类打字模拟，包含错误修正和真实打字模式
@@ -464,30 +1036,7 @@ class RealXHSPublisher:
             actions = HumanBehaviorSimulator.simulate_typing_errors(text, error_rate=0.015)
             
             # 执行打字动作
-            for i, action in enumerate(actions):
-                if action['type'] == 'type':
-                    # 使用动态延迟
-                    delay = random.uniform(*pattern['base_delay'])
-                    await self.page.keyboard.type(action['char'], delay=delay)
-                    
-                elif action['type'] == 'backspace':
-                    await self.page.keyboard.press('Backspace')
-                    await asyncio.sleep(random.uniform(0.1, 0.2))
-                    
-                elif action['type'] == 'pause':
-                    await asyncio.sleep(action['duration'])
-                
-                # 随机暂停，模拟思考
-                if random.random() < pattern['pause_probability']:
-                    await asyncio.sleep(random.uniform(*pattern['pause_delay']))
-                
-                # 定期思考暂停
-                if i > 0 and i % pattern['thinking_interval'] == 0:
-                    await asyncio.sleep(random.uniform(*pattern['thinking_delay']))
-                
-                # 偶尔分心（降低频率和概率）
-                if i > 0 and i % 100 == 0 and random.random() < 0.01:
-                    await asyncio.sleep(HumanBehaviorSimulator.distraction_delay())
+            await self._type_actions(actions, pattern)
             
             logger.info(f"✅ 高级人类打字完成: {selector} - {len(text)}字符")
             return True
@@ -500,25 +1049,39 @@ class RealXHSPublisher:
         """
         智能等待并点击，支持多个选择器，增强页面适应性
         """
-        start_time = time.time()
+        # 合并成一个选择器，由浏览器在任一元素可见时通知，而不是每0.5秒轮询；
+        # 每项加:visible，避免排在前面的隐藏匹配项拖住整个等待
+        combined = ', '.join(f'{s}:visible' for s in selectors)
         
-        while time.time() - start_time < timeout / 1000:
-            for selector in selectors:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element and await element.is_visible():
-                        success = await self.random_click(selector)
-                        if success:
-                            logger.info(f"智能点击成功: {description} - {selector}")
-                            return True
-                except:
-                    continue
-            
-            await asyncio.sleep(0.5)
+        try:
+            await self.page.wait_for_selector(combined, timeout=timeout, state='visible')
+        except Exception as e:
+            logger.warning(f"智能点击超时: {description} - {e}")
+            return False
         
-        logger.warning(f"智能点击超时: {description}")
+        try:
+            success = await self.random_click(combined, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"智能点击出错: {description} - {e}")
+            return False
+        
+        if success:
+            logger.info(f"智能点击成功: {description}")
+            return True
+        
+        logger.warning(f"智能点击失败: {description}")
         return False
     
+    async def _humanize(self, low: float, high: float):
+        """步骤间的随机停顿，从本次发布的预算中扣除；预算用完后只做极短停顿"""
+        if self._jitter_budget <= 0:
+            await asyncio.sleep(min(low, 0.1))
+            return
+        
+        delay = min(random.uniform(low, high), self._jitter_budget)
+        self._jitter_budget -= delay
+        await asyncio.sleep(delay)
+    
     async def retry_operation(self, operation, max_retries: int = 3, delay_range: Tuple[float, float] = (1, 3), description: str = "") -> bool:
         """
         重试机制，增强容错处理
@@ -546,7 +1109,9 @@ class RealXHSPublisher:
             return False
         
         try:
-            self.playwright = await async_playwright().start()
+            # 按user_id固定随机种子，同一用户每次会话使用相同的指纹（UA/视口）
+            seed = int.from_bytes(hashlib.blake2s(self.user_id.encode(), digest_size=8).digest(), 'little')
+            rng = random.Random(seed)
             
             # 随机User-Agent列表（真实的Chrome浏览器）
             user_agents = [
@@ -556,7 +1121,7 @@ class RealXHSPublisher:
                 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
             ]
-            selected_user_agent = random.choice(user_agents)
+            selected_user_agent = rng.choice(user_agents)
             
             # 简化的反检测浏览器参数（避免过度保护）
             browser_args = [
@@ -584,13 +1149,19 @@ class RealXHSPublisher:
                 {'width': 1536, 'height': 864},
                 {'width': 1440, 'height': 900}
             ]
-            selected_viewport = random.choice(viewports)
+            selected_viewport = rng.choice(viewports)
+            self._viewport = selected_viewport
             
-            # 启动浏览器
-            self.browser = await self.playwright.chromium.launch_persistent_context(
-                user_data_dir=str(self.user_data_dir),
-                headless=self.headless,
-                args=browser_args,
+            # 复用共享浏览器，为当前用户创建独立的上下文（登录态保存在state.json中）
+            self.browser, self._shared_generation = await _get_shared_browser(self.headless, browser_args)
+            self.playwright = _shared_playwright
+            
+            # 旧版本使用持久化用户目录保存登录态，首次启动时导出为state.json
+            if not os.path.exists(self.state_path) and (self.user_data_dir / "Default").is_dir():
+                await self._migrate_persistent_profile(browser_args)
+            
+            self.context = await self.browser.new_context(
+                storage_state=self.state_path if os.path.exists(self.state_path) else None,
                 viewport=selected_viewport,
                 user_agent=selected_user_agent,
                 locale='zh-CN',
@@ -605,22 +1176,55 @@ class RealXHSPublisher:
                 }
             )
             
+            # 实例被回收但没有调用close_browser时，兜底关闭上下文
+            self._finalizer = weakref.finalize(
+                self, _finalize_context, asyncio.get_running_loop(), self.context
+            )
+            
             # 获取页面
-            if len(self.browser.pages) > 0:
-                self.page = self.browser.pages[0]
-            else:
-                self.page = await self.browser.new_page()
+            self.page = await self.context.new_page()
             
             # 注入简化的反检测脚本
             await self._inject_stealth_scripts()
             
+            # 自定义反检测脚本注册为上下文级初始化脚本，每个页面/frame只执行一次
+            await self._inject_anti_detection_script()
+            
             logger.info(f"浏览器初始化成功，用户: {self.user_id}")
             return True
             
         except Exception as e:
             logger.error(f"浏览器初始化失败: {e}")
+            if self.context is None:
+                # 上下文未创建成功，不再占用共享浏览器
+                await self._release_browser()
             return False
     
+    async def _migrate_persistent_profile(self, browser_args: List[str]):
+        """从旧的持久化用户目录导出登录态到state.json，避免升级后需要重新登录"""
+        try:
+            legacy_context = await self.playwright.chromium.launch_persistent_context(
+                user_data_dir=str(self.user_data_dir),
+                headless=True,
+                args=browser_args,
+            )
+            try:
+                await legacy_context.storage_state(path=self.state_path)
+            finally:
+                await legacy_context.close()
+            logger.info(f"✅ 已从持久化用户目录迁移登录态: {self.state_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ 迁移持久化用户目录登录态失败，需要重新登录: {e}")
+    
+    async def _save_login_state(self):
+        """立即保存当前上下文的登录态（登录成功后调用，不依赖close_browser）"""
+        if self.context is None:
+            return
+        try:
+            await self.context.storage_state(path=self.state_path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存登录态失败: {e}")
+    
     async def _inject_stealth_scripts(self):
         """注入简化的反检测JavaScript代码"""
         try:
@@ -668,8 +1272,7 @@ class RealXHSPublisher:
             
             # 检查是否存在登录相关按钮
             for indicator in login_indicators:
-                element = await self.page.query_selector(indicator)
-                if element and await element.is_visible():
+                if await self.page.locator(indicator).first.is_visible():
                     return {
                         "logged_in": False,
                         "message": "用户未登录，请在浏览器中手动登录",
@@ -689,8 +1292,7 @@ class RealXHSPublisher:
             ]
             
             for indicator in user_indicators:
-                element = await self.page.query_selector(indicator)
-                if element and await element.is_visible():
+                if await self.page.locator(indicator).first.is_visible():
                     logger.info("✅ 检测到已登录状态")
                     return {
                         "logged_in": True,
@@ -713,34 +1315,80 @@ class RealXHSPublisher:
                 "confidence": "low"
             }
     
+    async def _cdp_evaluate(self, expression: str):
+        """通过CDP会话直接执行Runtime.evaluate，一次往返返回JSON结果"""
+        if self._cdp is None:
+            self._cdp = await self.context.new_cdp_session(self.page)
+        
+        result = await self._cdp.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True,
+        })
+        if 'exceptionDetails' in result:
+            raise Exception(result['exceptionDetails'].get('text', 'Runtime.evaluate 执行失败'))
+        return result['result'].get('value')
+    
+    def _get_http(self) -> aiohttp.ClientSession:
+        """懒加载的HTTP会话，多次下载复用连接"""
+        if self._http is None or self._http.closed:
+            # 图片基本来自少数几个CDN域名，限制每个域名的并发并保持长连接，后续下载省去TCP/TLS握手
+            connector = aiohttp.TCPConnector(limit=16, limit_per_host=8, ttl_dns_cache=300)
+            self._http = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        return self._http
+    
     async def download_image(self, image_url: str) -> Optional[str]:
         """下载图片到本地"""
+        cached = self._image_cache.get(image_url)
+        if cached and os.path.exists(cached):
+            logger.info(f"图片已下载，直接使用缓存: {cached}")
+            return cached
+        
+        part_path = None
         try:
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()
+            # 按URL哈希生成文件名，不同URL同名文件不会互相覆盖
+            key = hashlib.blake2s(image_url.encode(), digest_size=16).hexdigest()
+            ext = os.path.splitext(urlparse(image_url).path)[1].lower()
+            if ext not in _IMG_EXTS:
+                ext = '.jpg'
+            
+            file_path = self.download_dir / f"{key}{ext}"
+            
+            # 之前（包括之前的进程）已完整下载过同一URL，直接复用磁盘上的文件
+            if file_path.exists() and file_path.stat().st_size > 0:
+                logger.info(f"图片已存在，跳过下载: {file_path}")
+                self._image_cache[image_url] = str(file_path)
+                return str(file_path)
             
-            # 生成文件名
-            parsed_url = urlparse(image_url)
-            filename = os.path.basename(parsed_url.path) or f"image_{int(time.time())}.jpg"
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                filename += '.jpg'
+            part_path = file_path.with_name(file_path.name + '.part')
             
-            file_path = self.download_dir / filename
+            # 分块流式写入临时文件，写入放到线程池，不阻塞事件循环
+            loop = asyncio.get_running_loop()
+            async with self._get_http().get(image_url) as response:
+                response.raise_for_status()
+                with open(part_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                        await loop.run_in_executor(None, f.write, chunk)
             
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # 下载完整后再替换，避免留下半截图片
+            os.replace(part_path, file_path)
             
             logger.info(f"图片下载成功: {file_path}")
+            self._image_cache[image_url] = str(file_path)
             return str(file_path)
             
         except Exception as e:
             logger.error(f"下载图片失败 {image_url}: {e}")
+            if part_path is not None and part_path.exists():
+                part_path.unlink()
             return None
     
     async def publish_note(self, content: str, title: str, images: List[str] = None) -> Dict:
         """发布小红书笔记 - 根据是否有图片选择发布页面"""
+        prefetch = None
         try:
             logger.info("🚀 开始发布小红书笔记...")
+            self._jitter_budget = _JITTER_BUDGET
             
             # 步骤1: 根据是否有图片选择正确的发布页面
             has_images = images and len(images) > 0
@@ -748,63 +1396,23 @@ class RealXHSPublisher:
                 logger.info("📍 步骤1: 导航到图文发布页面")
                 publish_url = "https://creator.xiaohongshu.com/publish/publish?source=official"
                 logger.info(f"🖼️ 检测到图片，使用图文发布模式")
+                # 图片下载与页面导航/登录并行进行，上传时直接取结果
+                prefetch = asyncio.create_task(self._prefetch_images(images))
             else:
                 logger.info("📍 步骤1: 导航到长文发布页面")
                 publish_url = "https://creator.xiaohongshu.com/publish/publish?from=menu&target=article"
                 logger.info(f"📝 无图片，使用长文发布模式")
             
             try:
-                logger.info(f"🌐 访问发布页面: {publish_url}")
-                # 使用更宽松的等待条件，避免因持续请求导致 networkidle 无法达成
-                await self.page.goto(publish_url, wait_until='domcontentloaded', timeout=90000)
-                
-                # 等待页面加载
-                await asyncio.sleep(3)
-                
-                # 检查是否需要登录
-                current_url = self.page.url
-                if "login" in current_url.lower() or "signin" in current_url.lower():
-                    logger.info("🔐 检测到需要登录，等待用户登录...")
-                    
-                    if not self.headless:
-                        logger.info("⏳ 等待用户在浏览器中完成登录...")
-                        logger.info("📱 请扫描二维码或输入账号密码完成登录")
-                        logger.info("⏰ 系统将等待3分钟，请不要关闭浏览器")
-                        
-                        # 给用户更多时间登录 - 3分钟
-                        for i in range(180):  # 等待最多180秒（3分钟）
-                            await asyncio.sleep(1)
-                            
-                            # 每30秒检查一次URL变化
-                            if i % 30 == 0 and i > 0:
-                                current_url = self.page.url
-                                if "publish" in current_url and "login" not in current_url.lower():
-                                    logger.info("✅ 用户登录成功！")
-                                    break
-                            
-                            # 每30秒提示一次剩余时间
-                            if i % 30 == 0:
-                                remaining_time = 180 - i
-                                logger.info(f"⏳ 等待登录中... (还有{remaining_time}秒)")
-                        else:
-                            # 最后再检查一次
-                            current_url = self.page.url
-                            if "login" in current_url.lower() or "signin" in current_url.lower():
-                                return {
-                                    "success": False,
-                                    "message": "等待登录超时，请确保已在浏览器中完成登录后重新运行"
-                                }
-                    else:
-                        return {
-                            "success": False,
-                            "message": "用户未登录，无法发布内容"
-                        }
-                
-                # 重新导航到发布页面（登录后可能会跳转）
-                if "publish" not in self.page.url:
-                    logger.info("🔄 重新导航到发布页面")
-                    await self.page.goto(publish_url, wait_until='domcontentloaded', timeout=90000)
-                    await asyncio.sleep(3)
+                if has_images and await self._is_warm_publish_page():
+                    # 上一次发布留下的发布页仍可用，跳过导航和登录检查
+                    logger.info(f"♻️ 复用已打开的发布页面: {self.page.url}")
+                else:
+                    error = await self._navigate_to_publish_page(publish_url)
+                    if error:
+                        return error
+                    if has_images:
+                        self._warm_page = self.page
                 
                 logger.info(f"✅ 成功到达发布页面: {self.page.url}")
                 
@@ -831,19 +1439,18 @@ class RealXHSPublisher:
                     }
                 
                 # 点击"上传图文"标签页
-                try:
-                    await self._click_publish_tab("上传图文")
+                if await self._click_publish_tab("上传图文"):
                     logger.info("✅ 成功点击'上传图文'标签页")
-                except Exception as e:
-                    logger.warning(f"⚠️ 点击'上传图文'标签页失败: {e}")
+                else:
                     # 继续执行，可能已经在正确的标签页
+                    logger.warning("⚠️ 点击'上传图文'标签页失败")
                 
                 # 等待标签页切换完成
                 await asyncio.sleep(2)
                 
                 # 步骤3: 上传图片（图文模式的关键步骤）
                 logger.info("📸 步骤3: 上传图片")
-                upload_success = await self._upload_images(images)
+                upload_success = await self._upload_images(images, prefetch)
                 if not upload_success:
                     return {
                         "success": False,
@@ -877,79 +1484,225 @@ class RealXHSPublisher:
             logger.error(f"发布笔记时出错: {e}")
             return {"success": False, "message": f"发布失败: {str(e)}"}
         finally:
+            # 提前返回时不再需要预取结果
+            if prefetch is not None and not prefetch.done():
+                prefetch.cancel()
             if self.auto_close:
                 await self.close_browser()
     
-    async def _upload_images(self, images: List[str]) -> bool:
-        """上传图片 - 参考Go版本实现"""
+    async def _navigate_to_publish_page(self, publish_url: str) -> Optional[Dict]:
+        """导航到发布页面，必要时等待用户登录；失败时返回错误结果"""
+        logger.info(f"🌐 访问发布页面: {publish_url}")
+        # 使用更宽松的等待条件，避免因持续请求导致 networkidle 无法达成
+        await self.page.goto(publish_url, wait_until='domcontentloaded', timeout=90000)
+        
+        # 检查是否需要登录（未登录时会直接跳转到登录页）
+        current_url = self.page.url
+        if "login" in current_url.lower() or "signin" in current_url.lower():
+            logger.info("🔐 检测到需要登录，等待用户登录...")
+            
+            if not self.headless:
+                logger.info("⏳ 等待用户在浏览器中完成登录...")
+                logger.info("📱 请扫描二维码或输入账号密码完成登录")
+                logger.info("⏰ 系统将等待3分钟，请不要关闭浏览器")
+                
+                # 每30秒提示一次剩余时间
+                async def log_countdown():
+                    for remaining_time in range(180, 0, -30):
+                        logger.info(f"⏳ 等待登录中... (还有{remaining_time}秒)")
+                        await asyncio.sleep(30)
+                
+                countdown = asyncio.create_task(log_countdown())
+                try:
+                    # 给用户更多时间登录 - 3分钟，页面跳转时立即返回
+                    await self.page.wait_for_url(
+                        lambda url: "publish" in url and "login" not in url.lower(),
+                        timeout=180000
+                    )
+                    logger.info("✅ 用户登录成功！")
+                except Exception:
+                    # 最后再检查一次
+                    current_url = self.page.url
+                    if "login" in current_url.lower() or "signin" in current_url.lower():
+                        return {
+                            "success": False,
+                            "message": "等待登录超时，请确保已在浏览器中完成登录后重新运行"
+                        }
+                finally:
+                    countdown.cancel()
+                
+                # 登录成功后立即保存登录态，异常退出或不关闭浏览器时也不会丢失
+                await self._save_login_state()
+            else:
+                return {
+                    "success": False,
+                    "message": "用户未登录，无法发布内容"
+                }
+        
+        # 重新导航到发布页面（登录后可能会跳转）
+        if "publish" not in self.page.url:
+            logger.info("🔄 重新导航到发布页面")
+            await self.page.goto(publish_url, wait_until='domcontentloaded', timeout=90000)
+        
+        # 等待发布页的关键元素出现，而不是固定等待3秒
+        await self._wait_for_publish_root()
+        
+        return None
+    
+    async def _is_warm_publish_page(self) -> bool:
+        """检查上一次打开的图文发布页是否仍可直接复用"""
+        if self._warm_page is None or self._warm_page is not self.page or self.page.is_closed():
+            return False
+        if "publish" not in self.page.url:
+            return False
+        
+        try:
+            # 一次Page.getFrameTree确认页面会话仍然存活，避免完整导航
+            if self._cdp is None:
+                self._cdp = await self.context.new_cdp_session(self.page)
+            await asyncio.wait_for(self._cdp.send("Page.getFrameTree"), timeout=2)
+            # 上一次发布失败或中断时页面上可能残留预览图和文字，此时重新导航
+            clean = await self.page.evaluate(
+                _WARM_PAGE_CLEAN_JS,
+                [_PUBLISH_TITLE_WAIT_SELECTOR, _PUBLISH_CONTENT_WAIT_SELECTOR],
+            )
+            if not clean:
+                logger.debug("发布页残留上一次的内容，重新导航")
+                self._warm_page = None
+            return clean
+        except Exception as e:
+            logger.debug(f"发布页已失效，重新导航: {e}")
+            self._warm_page = None
+            return False
+    
+    async def _wait_for_publish_root(self, timeout: int = 15000):
+        """等待发布页可交互（超时不报错，后续步骤有各自的等待）"""
+        try:
+            await self.page.wait_for_selector(_PUBLISH_ROOT_SELECTOR, timeout=timeout)
+        except Exception as e:
+            logger.debug(f"等待发布页元素超时: {e}")
+    
+    async def _find_first_visible(self, selectors: Tuple[str, ...], cache_key: str = None) -> Optional[Dict]:
+        """一次evaluate按顺序找出第一个可见元素及其边界框；指定cache_key时优先尝试上次命中的选择器"""
+        cached = self._selector_hits.get(cache_key) if cache_key else None
+        if cached:
+            selectors = (cached,) + tuple(selectors)
+        
+        try:
+            hit = await self.page.evaluate(_FIND_FIRST_VISIBLE_JS, list(selectors))
+        except Exception as e:
+            logger.debug(f"查找可见元素失败: {e}")
+            return None
+        
+        if hit and cache_key:
+            self._selector_hits[cache_key] = hit['selector']
+        return hit
+    
+    async def _find_first_visible_enabled(self, selectors, cache_key: str = None) -> Optional[ElementHandle]:
+        """一次evaluate_handle按顺序找出第一个可见且未禁用的元素，找不到时返回None；指定cache_key时优先尝试上次命中的选择器"""
+        selectors = list(selectors)
+        hit_key = None
+        cached = None
+        if cache_key:
+            hit_key = (urlparse(self.page.url).netloc, cache_key)
+            cached = self._button_hits.get(hit_key)
+            if cached and time.monotonic() - cached[1] < _BUTTON_HIT_TTL:
+                selectors.insert(0, cached[0])
+            else:
+                cached = None
+        
+        try:
+            handle = await self.page.evaluate_handle(_FIND_FIRST_ENABLED_JS, selectors)
+        except Exception as e:
+            logger.debug(f"查找可用元素失败: {e}")
+            return None
+        
+        element = handle.as_element()
+        if element is None:
+            await handle.dispose()
+            return None
+        
+        if hit_key and cached is None:
+            # 缓存缺失或过期时才多一次往返，记录命中的选择器（只保存在Python端，不写入页面存储）
+            try:
+                index = await element.evaluate(_MATCHED_SELECTOR_INDEX_JS, selectors)
+                if index >= 0:
+                    self._button_hits[hit_key] = (selectors[index], time.monotonic())
+            except Exception as e:
+                logger.debug(f"记录命中的选择器失败: {e}")
+        return element
+    
+    async def _prefetch_images(self, images: List[str]) -> List[str]:
+        """下载URL图片并校验本地路径，按原顺序返回可用的本地图片路径"""
+        # 清理URL中的空格和引号
+        images = [item.strip().strip('"').strip("'").strip() for item in images]
+        
+        # 先分类：URL图片（去重）与本地路径
+        urls = list(dict.fromkeys(item for item in images if item.startswith(('http://', 'https://'))))
+        
+        # URL图片并发下载，单张失败不影响其他图片
+        results = await asyncio.gather(*(self.download_image(u) for u in urls), return_exceptions=True)
+        downloaded = {
+            url: None if isinstance(result, BaseException) else result
+            for url, result in zip(urls, results)
+        }
+        
+        # 处理图片文件（支持本地路径和URL），保持原有顺序
+        valid_images = []
+        for image_item in images:
+            if image_item in downloaded:
+                # 处理URL图片
+                logger.info(f"🌐 检测到图片URL: {image_item}")
+                downloaded_path = downloaded[image_item]
+                if downloaded_path and os.path.exists(downloaded_path):
+                    valid_images.append(downloaded_path)
+                    logger.info(f"✅ 图片下载成功: {downloaded_path}")
+                else:
+                    logger.warning(f"❌ 图片下载失败: {image_item}")
+            elif os.path.exists(image_item):
+                # 处理本地文件路径
+                valid_images.append(image_item)
+                logger.info(f"✅ 找到本地图片文件: {image_item}")
+            else:
+                logger.warning(f"❌ 图片文件不存在: {image_item}")
+        
+        return valid_images
+    
+    async def _upload_images(self, images: List[str], prefetch: Optional[asyncio.Task] = None) -> bool:
+        """上传图片 - 参考Go版本实现；prefetch为publish_note提前启动的图片准备任务"""
         if not images:
             return True
             
         try:
             logger.info(f"📸 开始上传 {len(images)} 张图片")
             
-            # 处理图片文件（支持本地路径和URL）
-            valid_images = []
-            for image_item in images:
-                # 清理URL中的空格和引号
-                image_item = image_item.strip().strip('"').strip("'").strip()
-                
-                if image_item.startswith(('http://', 'https://')):
-                    # 处理URL图片
-                    logger.info(f"🌐 检测到图片URL: {image_item}")
-                    downloaded_path = await self.download_image(image_item)
-                    if downloaded_path and os.path.exists(downloaded_path):
-                        valid_images.append(downloaded_path)
-                        logger.info(f"✅ 图片下载成功: {downloaded_path}")
-                    else:
-                        logger.warning(f"❌ 图片下载失败: {image_item}")
-                elif os.path.exists(image_item):
-                    # 处理本地文件路径
-                    valid_images.append(image_item)
-                    logger.info(f"✅ 找到本地图片文件: {image_item}")
-                else:
-                    logger.warning(f"❌ 图片文件不存在: {image_item}")
+            if prefetch is not None:
+                valid_images = await prefetch
+            else:
+                valid_images = await self._prefetch_images(images)
             
             if not valid_images:
                 logger.warning("没有有效的图片文件")
                 return False
             
-            # 注意：标签页切换已在主流程中完成，直接查找上传区域
-            logger.info("🎯 在上传图文标签页中查找上传区域")
-            
-            # 等待上传区域出现
-            try:
-                await self.page.wait_for_selector('.upload-content', timeout=10000)
-                logger.info("✅ 找到上传区域")
-            except:
-                logger.warning("⚠️ 未找到上传区域，继续尝试")
-            
-            # 查找上传输入框 - 优先使用Go版本的选择器
-            upload_selectors = [
-                '.upload-input',  # Go版本使用的选择器
-                'input[type="file"]',
-                'input[accept*="image"]',
-                '.upload-area input[type="file"]',
-                '.file-input'
-            ]
-            
-            upload_input = None
-            for selector in upload_selectors:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element:
-                        upload_input = element
-                        logger.info(f"✅ 找到上传输入框: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not upload_input:
+            # 注意：标签页切换和上传区域(.upload-content)的等待已在主流程中完成
+            # 一次evaluate按优先级找出页面上存在的上传输入框选择器，上次命中的排在最前
+            selectors = list(_UPLOAD_INPUT_SELECTORS)
+            if self._upload_input_sel:
+                selectors.remove(self._upload_input_sel)
+                selectors.insert(0, self._upload_input_sel)
+            selector = await self.page.evaluate(
+                "(sels) => sels.find(s => document.querySelector(s)) || null", selectors
+            )
+            if not selector:
                 logger.error("❌ 未找到图片上传输入框")
                 return False
             
+            self._upload_input_sel = selector
+            logger.info(f"✅ 找到上传输入框: {selector}")
+            
             # 上传图片文件
-            await upload_input.set_input_files(valid_images)
+            await self.page.locator(selector).first.set_input_files(valid_images)
             logger.info(f"✅ 图片文件已设置到上传输入框")
             
             # 等待上传完成 - 使用Go版本的检测逻辑
@@ -962,31 +1715,26 @@ class RealXHSPublisher:
     async def _click_publish_tab(self, tab_name: str) -> bool:
         """点击发布标签页（对应Go版本的mustClickPublishTab）"""
         try:
+            find_tab = f"({_FIND_CREATOR_TAB_JS})({json.dumps(tab_name)})"
             max_attempts = 75  # 15秒 / 200ms
             for attempt in range(max_attempts):
                 try:
-                    # 查找所有creator-tab元素
-                    tab_elements = await self.page.query_selector_all('div.creator-tab')
+                    # 一次往返完成查找、隐藏/视口过滤、滚动与遮挡检查
+                    target = await self._cdp_evaluate(find_tab)
                     
-                    for tab_element in tab_elements:
-                        # 检查元素是否可见
-                        if not await tab_element.is_visible():
+                    if target:
+                        # 检查元素是否被遮挡
+                        if target['blocked']:
+                            logger.info("发布标签页被遮挡，尝试移除遮挡")
+                            await self._remove_pop_cover()
+                            await asyncio.sleep(0.2)
                             continue
-                            
-                        # 获取文本内容
-                        text_content = await tab_element.text_content()
-                        if text_content and text_content.strip() == tab_name:
-                            # 检查元素是否被遮挡
-                            if await self._is_element_blocked(tab_element):
-                                logger.info("发布标签页被遮挡，尝试移除遮挡")
-                                await self._remove_pop_cover()
-                                await asyncio.sleep(0.2)
-                                continue
-                            
-                            # 点击标签页
-                            await tab_element.click()
-                            logger.info(f"成功点击{tab_name}标签页")
-                            return True
+                        
+                        # 点击标签页
+                        await self.page.mouse.click(target['x'], target['y'])
+                        self._last_mouse = (target['x'], target['y'])
+                        logger.info(f"成功点击{tab_name}标签页")
+                        return True
                     
                     await asyncio.sleep(0.2)
                     
@@ -1015,45 +1763,41 @@ class RealXHSPublisher:
         except Exception as e:
             logger.debug(f"移除弹窗遮挡时出错: {e}")
 
-    async def _click_empty_position(self):
-        """点击空白位置（对应Go版本的clickEmptyPosition）"""
-        try:
-            import random
-            x = 380 + random.randint(0, 100)
-            y = 20 + random.randint(0, 60)
-            await self.page.mouse.click(x, y)
-        except Exception as e:
-            logger.debug(f"点击空白位置时出错: {e}")
-
-
-
     async def _wait_for_upload_complete(self, expected_count: int) -> bool:
         """等待图片上传完成（对应Go版本的waitForUploadComplete）"""
         try:
             logger.info(f"⏳ 开始等待图片上传完成，期望数量: {expected_count}")
             
             max_wait_time = 60  # 最大等待60秒
-            check_interval = 0.5  # 每0.5秒检查一次
-            start_time = time.time()
             
-            while time.time() - start_time < max_wait_time:
-                try:
-                    # 使用Go版本的选择器检查已上传的图片
-                    uploaded_images = await self.page.query_selector_all('.img-preview-area .pr')
-                    current_count = len(uploaded_images)
-                    
-                    logger.info(f"检测到已上传图片数量: {current_count}, 期望数量: {expected_count}")
+            # 页面内用MutationObserver监听预览区变化，数量达标或超时时返回当前数量，
+            # Python侧只需等待一次
+            current_count = await self.page.evaluate("""
+                ([expected, timeoutMs]) => new Promise(resolve => {
+                    // 使用Go版本的选择器检查已上传的图片
+                    const count = () => document.querySelectorAll('.img-preview-area .pr').length;
+                    if (count() >= expected) return resolve(count());
                     
-                    if current_count >= expected_count:
-                        logger.info(f"✅ 所有图片上传完成，数量: {current_count}")
-                        return True
-                        
-                except Exception as e:
-                    logger.debug(f"检查上传状态时出错: {e}")
-                
-                await asyncio.sleep(check_interval)
+                    const observer = new MutationObserver(() => {
+                        if (count() >= expected) {
+                            observer.disconnect();
+                            clearTimeout(timer);
+                            resolve(count());
+                        }
+                    });
+                    const timer = setTimeout(() => {
+                        observer.disconnect();
+                        resolve(count());
+                    }, timeoutMs);
+                    observer.observe(document.body, {childList: true, subtree: true});
+                })
+            """, [expected_count, max_wait_time * 1000])
             
-            logger.error("❌ 上传超时，请检查网络连接和图片大小")
+            if current_count >= expected_count:
+                logger.info(f"✅ 所有图片上传完成，数量: {current_count}")
+                return True
+            
+            logger.error(f"❌ 上传超时（已上传 {current_count}/{expected_count}），请检查网络连接和图片大小")
             return False
             
         except Exception as e:
@@ -1061,157 +1805,67 @@ class RealXHSPublisher:
             return False
 
     async def _inject_anti_detection_script(self):
-        """注入自定义反检测脚本"""
+        """注册自定义反检测脚本（浏览器启动时调用一次）"""
         try:
             anti_detection_script = """
             // 自定义反检测脚本
             (function() {
+                // 防止重复注入时层层包装原型方法
+                if (window.__ad_installed) return;
+                window.__ad_installed = true;
+                
                 // 1. 覆盖webdriver检测
                 Object.defineProperty(navigator, 'webdriver', {
                     get: () => undefined,
                     configurable: true
                 });
                 
-                // 2. 模拟真实用户行为
-                const originalAddEventListener = EventTarget.prototype.addEventListener;
-                EventTarget.prototype.addEventListener = function(type, listener, options) {
-                    if (type === 'mousedown' || type === 'mouseup' || type === 'click') {
-                        // 添加微小的随机延迟
-                        setTimeout(() => {
-                            originalAddEventListener.call(this, type, listener, options);
-                        }, Math.random() * 10);
-                    } else {
-                        originalAddEventListener.call(this, type, listener, options);
-                    }
-                };
-                
-                // 3. 模拟真实的鼠标移动轨迹
+                // 2. 记录鼠标移动轨迹（单个捕获阶段的被动监听器，开销与页面监听器数量无关）
+                // 点击和键盘的随机延迟由Python侧的鼠标/打字模拟负责
                 let lastMouseX = 0, lastMouseY = 0;
                 document.addEventListener('mousemove', function(e) {
                     lastMouseX = e.clientX;
                     lastMouseY = e.clientY;
-                });
+                }, { capture: true, passive: true });
                 
-                // 4. 覆盖一些常见的自动化检测
+                // 3. 覆盖一些常见的自动化检测
                 window.chrome = window.chrome || {};
                 window.chrome.runtime = window.chrome.runtime || {};
                 
-                // 5. 模拟真实的键盘输入间隔
-                const originalDispatchEvent = EventTarget.prototype.dispatchEvent;
-                EventTarget.prototype.dispatchEvent = function(event) {
-                    if (event.type === 'keydown' || event.type === 'keyup') {
-                        // 添加随机延迟模拟真实输入
-                        setTimeout(() => {
-                            originalDispatchEvent.call(this, event);
-                        }, Math.random() * 50 + 10);
-                    } else {
-                        originalDispatchEvent.call(this, event);
-                    }
-                };
-                
                 console.log('🛡️ 反检测脚本已注入');
             })();
             """
             
-            await self.page.evaluate(anti_detection_script)
-            logger.info("🛡️ 反检测脚本注入成功")
+            await self.context.add_init_script(script=anti_detection_script)
+            logger.info("🛡️ 反检测脚本注册成功")
         except Exception as e:
             logger.debug(f"反检测脚本注入失败: {e}")
 
     async def _simulate_human_behavior(self):
         """模拟真人行为"""
         try:
-            # 随机鼠标移动
-            viewport = await self.page.viewport_size()
+            # 随机鼠标移动（视口在启动浏览器时已确定，无需再向页面查询）
+            viewport = self._viewport
             if viewport:
-                for _ in range(random.randint(2, 5)):
-                    x = random.randint(100, viewport['width'] - 100)
-                    y = random.randint(100, viewport['height'] - 100)
+                width, height = viewport['width'], viewport['height']
+                moves = [
+                    (random.randint(100, width - 100), random.randint(100, height - 100), random.uniform(0.1, 0.3))
+                    for _ in range(random.randint(2, 5))
+                ]
+                for x, y, pause in moves:
                     await self.page.mouse.move(x, y)
-                    await asyncio.sleep(random.uniform(0.1, 0.3))
+                    await asyncio.sleep(pause)
+                self._last_mouse = (x, y)
             
             # 随机滚动
             scroll_distance = random.randint(-200, 200)
             await self.page.mouse.wheel(0, scroll_distance)
-            await asyncio.sleep(random.uniform(0.5, 1.5))
+            await self._humanize(0.5, 1.5)
             
             logger.debug("🤖 人类行为模拟完成")
         except Exception as e:
             logger.debug(f"人类行为模拟失败: {e}")
 
-    async def _click_publish_tab(self, tab_text):
-        """点击发布标签页（基于Go版本逻辑）"""
-        try:
-            logger.info(f"🎯 尝试点击'{tab_text}'标签页")
-            
-            # 等待上传内容区域出现（Go版本的逻辑）
-            await self.page.wait_for_selector('div.upload-content', timeout=30000)
-            
-            # 查找所有creator-tab元素
-            tab_elements = await self.page.query_selector_all('div.creator-tab')
-            
-            target_tab = None
-            for tab_element in tab_elements:
-                try:
-                    # 检查元素是否可见
-                    if not await tab_element.is_visible():
-                        continue
-                    
-                    # 检查元素是否被隐藏（通过style属性）
-                    style = await tab_element.get_attribute('style')
-                    if style and ('left: -9999px' in style or 'position: absolute' in style):
-                        logger.debug(f"跳过隐藏的标签页元素: {style}")
-                        continue
-                    
-                    # 检查元素是否在视口内
-                    bounding_box = await tab_element.bounding_box()
-                    if not bounding_box or bounding_box['x'] < 0 or bounding_box['y'] < 0:
-                        logger.debug(f"跳过视口外的标签页元素: {bounding_box}")
-                        continue
-                    
-                    # 获取元素文本内容
-                    text_content = await tab_element.text_content()
-                    if text_content and text_content.strip() == tab_text:
-                        target_tab = tab_element
-                        logger.info(f"✅ 找到匹配的标签页: '{text_content.strip()}'")
-                        break
-                        
-                except Exception as e:
-                    logger.debug(f"检查标签页元素失败: {e}")
-                    continue
-            
-            if not target_tab:
-                raise Exception(f"未找到文本为'{tab_text}'的标签页")
-            
-            # 滚动到元素位置
-            await target_tab.scroll_into_view_if_needed()
-            await asyncio.sleep(0.5)
-            
-            # 点击标签页
-            await target_tab.click()
-            logger.info(f"✅ 成功点击'{tab_text}'标签页")
-            
-            # 等待标签页切换完成
-            await asyncio.sleep(1)
-            
-            # 验证点击是否成功
-            logger.info(f"🔍 验证'{tab_text}'标签页点击效果...")
-            try:
-                # 检查页面是否有变化
-                current_url = self.page.url
-                logger.info(f"📍 当前页面URL: {current_url}")
-                
-                # 检查是否有上传相关的元素出现
-                upload_elements = await self.page.query_selector_all('.upload-input, input[type="file"], [class*="upload"]')
-                logger.info(f"🔍 找到 {len(upload_elements)} 个上传相关元素")
-                
-            except Exception as e:
-                logger.debug(f"验证点击效果时出错: {e}")
-            
-        except Exception as e:
-            logger.error(f"❌ 点击'{tab_text}'标签页失败: {e}")
-            raise
-
     async def _wait_for_page_ready(self):
         """等待页面完全加载"""
         try:
@@ -1239,7 +1893,10 @@ class RealXHSPublisher:
             logger.warning(f"⚠️ 等待页面加载时出错: {e}")
 
     async def _analyze_page_structure(self):
-        """分析页面DOM结构，帮助定位元素"""
+        """分析页面DOM结构，帮助定位元素（仅在debug_dom开启时执行）"""
+        if not self.debug_dom:
+            return
+        
         try:
             logger.info("🔍 分析页面DOM结构...")
             
@@ -1311,53 +1968,19 @@ class RealXHSPublisher:
             logger.warning(f"⚠️ 页面结构分析失败: {e}")
 
     async def _wait_for_publish_page_elements(self):
-        """等待发布页面的关键元素加载"""
+        """等待发布页面的关键元素加载（标题或内容输入框任一出现，最多5秒）"""
         try:
             logger.info("🔍 等待发布页面关键元素加载...")
             
-            # 等待标题输入框
-            title_selectors = [
-                'textarea[placeholder*="输入标题"]',
-                'input[placeholder*="标题"]',
-                'input[placeholder*="title"]',
-                '.title-input',
-                '[data-testid="title-input"]'
-            ]
-            
-            title_found = False
-            for selector in title_selectors:
-                try:
-                    await self.page.wait_for_selector(selector, timeout=3000)
-                    logger.info(f"✅ 找到标题输入框: {selector}")
-                    title_found = True
-                    break
-                except:
-                    continue
-            
-            # 等待内容输入框
-            content_selectors = [
-                'div.tiptap.ProseMirror[contenteditable="true"]',
-                'textarea[placeholder*="内容"]',
-                'div[contenteditable="true"]',
-                '.content-editor'
-            ]
-            
-            content_found = False
-            for selector in content_selectors:
-                try:
-                    await self.page.wait_for_selector(selector, timeout=3000)
-                    logger.info(f"✅ 找到内容输入框: {selector}")
-                    content_found = True
-                    break
-                except:
-                    continue
-            
-            if not title_found and not content_found:
-                logger.warning("⚠️ 未找到标题或内容输入框，额外等待...")
-                await self.page.wait_for_timeout(3000)
+            await self.page.wait_for_function(
+                "([t, c]) => !!(document.querySelector(t) || document.querySelector(c))",
+                arg=[_PUBLISH_TITLE_WAIT_SELECTOR, _PUBLISH_CONTENT_WAIT_SELECTOR],
+                timeout=5000
+            )
+            logger.info("✅ 发布页面输入框已加载")
             
         except Exception as e:
-            logger.warning(f"⚠️ 等待发布页面元素时出错: {e}")
+            logger.warning(f"⚠️ 未在5秒内找到标题或内容输入框: {e}")
 
     async def _fill_content_and_publish(self, content: str, title: str, images: List[str] = None) -> Dict:
         """填写内容并发布"""
@@ -1367,322 +1990,168 @@ class RealXHSPublisher:
             # 等待页面完全加载
             await self._wait_for_page_ready()
             
-            # 注入反检测脚本
-            await self._inject_anti_detection_script()
-            
             # 模拟人类行为
             await self._simulate_human_behavior()
             
             # 等待发布页面关键元素加载
             await self._wait_for_publish_page_elements()
             
-            await asyncio.sleep(random.uniform(1, 2))
+            await self._humanize(1, 2)
             
             # 注意：图片上传已在主流程中完成，这里直接填写内容
             if images and len(images) > 0:
+                mode = 'image'
                 logger.info("图文模式：图片已上传，开始填写内容")
             else:
+                mode = 'article'
                 logger.info("长文模式：开始填写内容")
             
             # 步骤1: 填写标题（支持图文和长文模式）
             if title:
-                title_selectors = [
-                    # 长文模式优先选择器（参考备份文件）
-                    'textarea[placeholder*="输入标题"]',
-                    'textarea.d-text[placeholder*="输入标题"]',
-                    'input[placeholder*="标题"]',
-                    'input[placeholder*="title"]',
-                    'input[placeholder*="Title"]',
-                    'input[placeholder*="请输入标题"]',
-                    '.title-input',
-                    '[data-testid="title-input"]',
-                    'textarea[placeholder*="标题"]',
-                    'input[type="text"]:first-of-type',
-                    'input[type="text"]',
-                    
-                    # 图文模式选择器
-                    'div.d-input input',  # Go版本使用的选择器
-                    
-                    # 通用选择器
-                    '[contenteditable="true"]',
-                    '.note-title',
-                    '.title-editor',
-                    'textarea:not([style*="display: none"])',
-                    'input:not([style*="display: none"])',
-                    
-                    # 更广泛的选择器
-                    'textarea',
-                    'input[type="text"]'
-                ]
-                
                 title_filled = False
-                for selector in title_selectors:
+                # 一次evaluate找到第一个可见的标题输入框（已滚动到视图内）及其边界框
+                hit = await self._find_first_visible(_TITLE_SELECTORS, cache_key=f"title:{mode}")
+                if hit:
+                    selector = hit['selector']
                     try:
-                        element = await self.page.query_selector(selector)
-                        if element and await element.is_visible():
-                            # 智能点击，避免遮挡
-                            await element.scroll_into_view_if_needed()
-                            await asyncio.sleep(random.uniform(0.2, 0.5))
-                            
-                            # 随机坐标点击
-                            box = await element.bounding_box()
-                            if box:
-                                x = box['x'] + random.uniform(10, box['width'] - 10)
-                                y = box['y'] + random.uniform(5, box['height'] - 5)
-                                await self.page.mouse.click(x, y)
-                            else:
-                                await element.click()
-                            
-                            await asyncio.sleep(random.uniform(0.3, 0.8))
-                            
-                            # 使用高级输入模拟
-                            await element.fill('')
-                            await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
-                            
-                            # 获取打字模式并执行高级输入
+                        await self._humanize(0.2, 0.5)
+                        
+                        # 随机坐标点击
+                        x = hit['x'] + random.uniform(10, hit['width'] - 10)
+                        y = hit['y'] + random.uniform(5, hit['height'] - 5)
+                        await self.page.mouse.click(x, y)
+                        self._last_mouse = (x, y)
+                        
+                        await self._humanize(0.3, 0.8)
+                        
+                        # 使用高级输入模拟
+                        await self.page.locator(selector).first.fill('')
+                        await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
+                        
+                        if self.paranoid_typing:
+                            # 获取打字模式并执行逐字符高级输入
                             pattern = HumanBehaviorSimulator.get_typing_pattern(len(title))
                             actions = HumanBehaviorSimulator.simulate_typing_errors(title, error_rate=0.01)
                             
-                            for i, action in enumerate(actions):
-                                if action['type'] == 'type':
-                                    delay = random.uniform(*pattern['base_delay'])
-                                    await self.page.keyboard.type(action['char'], delay=delay)
-                                elif action['type'] == 'backspace':
-                                    await self.page.keyboard.press('Backspace')
-                                    await asyncio.sleep(random.uniform(0.1, 0.2))
-                                elif action['type'] == 'pause':
-                                    await asyncio.sleep(action['duration'])
-                                
-                                # 随机思考暂停
-                                if random.random() < pattern['pause_probability']:
-                                    await asyncio.sleep(random.uniform(*pattern['pause_delay']))
-                            
-                            logger.info(f"✅ 标题填写完成: {title}")
-                            title_filled = True
-                            break
+                            await self._type_actions(actions, pattern)
+                        elif hit['tag'] in ('input', 'textarea'):
+                            # 普通输入框：一次fill写入
+                            await self.page.locator(selector).first.fill(title)
+                        else:
+                            await self._insert_text_chunked(title)
+                        
+                        logger.info(f"✅ 标题填写完成: {title}")
+                        title_filled = True
                     except Exception as e:
                         logger.debug(f"标题选择器 {selector} 失败: {e}")
-                        continue
                 
                 if not title_filled:
                     logger.warning("未能填写标题")
             
-            await asyncio.sleep(random.uniform(1, 2))
+            await self._humanize(1, 2)
             
             # 步骤2: 填写正文内容（支持图文和长文模式）
-            content_selectors = [
-                # 图文模式选择器
-                'div.ql-editor',  # Go版本首选的选择器
-                'p[data-placeholder*="输入正文描述"]',  # Go版本的备选选择器
-                
-                # 长文模式选择器（参考备份文件）
-                'div.tiptap.ProseMirror[contenteditable="true"]',  # 富文本编辑器
-                'textarea[placeholder*="内容"]',
-                'textarea[placeholder*="content"]',
-                'textarea[placeholder*="正文"]',
-                'textarea[placeholder*="文本"]',
-                'textarea[placeholder*="输入"]',
-                'textarea[placeholder*="写点什么"]',
-                'textarea[placeholder*="分享"]',
-                'textarea[placeholder*="小红书"]',
-                'textarea[placeholder*="笔记"]',
-                
-                # 通用选择器
-                'div[contenteditable="true"]',
-                '[contenteditable="true"]',
-                '.content-editor',
-                '.note-editor',
-                '.text-editor',
-                '.editor',
-                'textarea:not([style*="display: none"])',
-                'div[contenteditable]:not([style*="display: none"])'
-            ]
             
             content_filled = False
-            for selector in content_selectors:
+            # 一次evaluate找到第一个可见的正文输入框（已滚动到视图内）、标签名及边界框
+            hit = await self._find_first_visible(_CONTENT_SELECTORS, cache_key=f"content:{mode}")
+            if hit:
+                selector = hit['selector']
                 try:
-                    element = await self.page.query_selector(selector)
-                    if element and await element.is_visible():
-                        # 智能点击，避免遮挡
-                        await element.scroll_into_view_if_needed()
-                        await asyncio.sleep(random.uniform(0.3, 0.7))
-                        
-                        # 随机坐标点击
-                        box = await element.bounding_box()
-                        if box:
-                            x = box['x'] + random.uniform(20, box['width'] - 20)
-                            y = box['y'] + random.uniform(10, box['height'] - 10)
-                            await self.page.mouse.click(x, y)
-                        else:
-                            await element.click()
-                        
-                        await asyncio.sleep(random.uniform(0.5, 1.0))
-                        
-                        # 对于富文本编辑器，使用键盘插入文本
-                        tag_name = await element.evaluate("el => el.tagName.toLowerCase()")
-                        if tag_name == 'div' and 'contenteditable' in selector:
-                            # 富文本编辑器：使用键盘插入
-                            try:
-                                await self.page.keyboard.insert_text(content)
-                                logger.info(f"✅ 正文内容填写完成（富文本模式）: {content[:50]}...")
-                                content_filled = True
-                                break
-                            except Exception:
-                                # 回退到逐字符输入
-                                pass
-                        
-                        # 清空现有内容并逐字符输入
+                    await self._humanize(0.3, 0.7)
+                    
+                    # 随机坐标点击
+                    x = hit['x'] + random.uniform(20, hit['width'] - 20)
+                    y = hit['y'] + random.uniform(10, hit['height'] - 10)
+                    await self.page.mouse.click(x, y)
+                    self._last_mouse = (x, y)
+                    
+                    await self._humanize(0.5, 1.0)
+                    
+                    # 富文本编辑器点击后直接在光标处插入，其他输入框先清空
+                    if not (hit['tag'] == 'div' and 'contenteditable' in selector):
                         try:
-                            await element.fill('')
+                            await self.page.locator(selector).first.fill('')
                         except:
                             # 对于某些富文本编辑器，fill可能不工作
                             await self.page.keyboard.press('Control+a')
                             await asyncio.sleep(0.1)
                             await self.page.keyboard.press('Delete')
-                        
-                        await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
-                        
-                        # 使用高级输入模拟输入正文内容
+                    
+                    await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
+                    
+                    if self.paranoid_typing:
+                        # 逐字符高级输入模拟
                         pattern = HumanBehaviorSimulator.get_typing_pattern(len(content))
                         actions = HumanBehaviorSimulator.simulate_typing_errors(content, error_rate=0.008)
                         
-                        for i, action in enumerate(actions):
-                            if action['type'] == 'type':
-                                delay = random.uniform(*pattern['base_delay'])
-                                await self.page.keyboard.type(action['char'], delay=delay)
-                            elif action['type'] == 'backspace':
-                                await self.page.keyboard.press('Backspace')
-                                await asyncio.sleep(random.uniform(0.1, 0.2))
-                            elif action['type'] == 'pause':
-                                await asyncio.sleep(action['duration'])
-                            
-                            # 随机思考暂停
-                            if random.random() < pattern['pause_probability']:
-                                await asyncio.sleep(random.uniform(*pattern['pause_delay']))
-                            
-                            # 定期思考暂停
-                            if i > 0 and i % pattern['thinking_interval'] == 0:
-                                await asyncio.sleep(random.uniform(*pattern['thinking_delay']))
-                            
-                            # 长文本分心暂停（降低频率）
-                            if i > 0 and i % 200 == 0 and random.random() < 0.01:
-                                await asyncio.sleep(HumanBehaviorSimulator.distraction_delay())
-                        
-                        logger.info(f"✅ 正文内容填写完成: {content[:50]}...")
-                        content_filled = True
-                        break
+                        # 长正文在页面内一次执行，失败时回退到键盘输入
+                        try:
+                            typed = await self._type_actions_in_page(selector, actions, pattern)
+                        except Exception as e:
+                            logger.debug(f"页面内输入失败，回退到键盘输入: {e}")
+                            typed = False
+                        if not typed:
+                            await self._type_actions(actions, pattern)
+                    
+                    elif hit['tag'] in ('input', 'textarea'):
+                        # 普通输入框：一次fill写入全部内容
+                        await self.page.locator(selector).first.fill(content)
+                    else:
+                        # 富文本编辑器：按句子分段insert_text，每段一次CDP调用
+                        await self._insert_text_chunked(content)
+                    
+                    logger.info(f"✅ 正文内容填写完成: {content[:50]}...")
+                    content_filled = True
                 except Exception as e:
                     logger.debug(f"内容选择器 {selector} 失败: {e}")
-                    continue
             
             if not content_filled:
                 return {"success": False, "message": "找不到正文内容输入框"}
             
-            await asyncio.sleep(random.uniform(1, 2))
+            await self._humanize(1, 2)
             
-            # 步骤3: 点击一键排版按钮（如果存在）
-            layout_selectors = [
-                # 基于用户提供的HTML结构
-                'button:has-text("一键排版")',
-                'button[class*="d-button"][class*="next-btn"]:has-text("一键排版")',
-                'button[class*="custom-button"][class*="bg-red"]:has-text("一键排版")',
-                'span[class*="next-btn-text"]:has-text("一键排版")',
-                'div.footer button:has-text("一键排版")',
-                # 原有选择器
-                'button[title*="排版"]',
-                '.layout-btn',
-                '.format-btn'
-            ]
+            # 『一键排版』和『下一步』互不依赖，先并发查找两个按钮，点击仍按顺序进行
+            layout_button, next_button = await asyncio.gather(
+                self._find_first_visible_enabled(_LAYOUT_BUTTON_SELECTORS, cache_key="一键排版"),
+                self._find_first_visible_enabled(_NEXT_BUTTON_SELECTORS, cache_key="下一步"),
+            )
             
-            await self._click_button_with_selectors("一键排版", layout_selectors, required=False)
+            # 步骤3: 点击一键排版按钮（如果存在）
+            await self._click_button_with_selectors("一键排版", _LAYOUT_BUTTON_SELECTORS, required=False, element=layout_button)
             
             # 步骤4: 点击下一步按钮（如果存在）
-            next_selectors = [
-                # 基于用户提供的HTML结构
-                'button:has-text("下一步")',
-                'button[class*="d-button-large"][class*="submit"]:has-text("下一步")',
-                'button[class*="d-button"][class*="--color-bg-primary"]:has-text("下一步")',
-                'span[class*="d-text"]:has-text("下一步")',
-                'div.footer button:has-text("下一步")',
-                # 原有选择器
-                'button:has-text("继续")',
-                'button:has-text("Next")',
-                '.next-btn',
-                '.continue-btn'
-            ]
-            
-            await self._click_button_with_selectors("下一步", next_selectors, required=False)
+            await self._click_button_with_selectors("下一步", _NEXT_BUTTON_SELECTORS, required=False, element=next_button)
             
             # 步骤5: 点击发布按钮（改进版本）
-            publish_selectors = [
-                # 基于用户提供的HTML结构
-                'button[class*="publishBtn"]:has-text("发布")',
-                'button[class*="d-button-large"][class*="red"]:has-text("发布")',
-                'button[data-impression*="note_compose_target"]:has-text("发布")',
-                'div.submit button:has-text("发布")',
-                'span[class*="d-text"]:has-text("发布")',
-                # 原有选择器
-                'div.submit div.d-button-content',  # Go版本使用的选择器
-                'button:has-text("发布")',
-                'button:has-text("发表")',
-                'div.submit button',
-                'button[class*="submit"]',
-                # 长文模式额外选择器
-                'button:has-text("发布笔记")',
-                'button:has-text("立即发布")',
-                'button:has-text("确认发布")',
-                'button[type="submit"]',
-                '.publish-btn',
-                '.submit-btn'
-            ]
-            
-            # 查找发布按钮（跳过禁用的）
-            publish_locator = None
-            for selector in publish_selectors:
+            # 查找发布按钮（跳过隐藏和禁用的），一次evaluate_handle完成
+            publish_locator = await self._find_first_visible_enabled(_PUBLISH_BUTTON_SELECTORS, cache_key="发布")
+            if publish_locator:
+                logger.info("✅ 找到可用发布按钮")
+            else:
+                # 角色名与XPath回退合并为一个Locator，由引擎一次解析
+                fallback = self.page.get_by_role("button", name=_PUBLISH_BTN_RE).or_(
+                    self.page.locator(_PUBLISH_BTN_XPATH)
+                )
                 try:
-                    elements = await self.page.query_selector_all(selector)
-                    for element in elements:
-                        if await element.is_visible():
-                            # 检查是否禁用
-                            try:
-                                is_disabled = await element.evaluate("el => !!(el.disabled || el.getAttribute('disabled'))")
-                            except Exception:
-                                is_disabled = False
-                            if not is_disabled:
-                                publish_locator = element
-                                logger.info(f"✅ 找到可用发布按钮: {selector}")
-                                break
-                    if publish_locator:
-                        break
+                    publish_locator = await fallback.first.element_handle(timeout=5000)
+                    logger.info("✅ 通过角色名/XPath找到发布按钮")
                 except Exception as e:
-                    logger.debug(f"发布按钮选择器失败 {selector}: {e}")
-                    continue
+                    logger.debug(f"基于角色/XPath查找发布按钮失败: {e}")
             
             publish_clicked = False
+            success_indicator = self.page.locator(_SUCCESS_INDICATOR_SELECTOR)
+            # 点击前已存在的匹配项不算成功提示，只等待点击后新出现的
+            existing_indicators = 0
             if publish_locator:
                 try:
-                    # 滚动到视图中
-                    await publish_locator.scroll_into_view_if_needed()
-                    
-                    # 等待按钮可见
-                    await asyncio.sleep(0.5)
-                    
-                    # 轮询禁用状态
-                    for _ in range(10):
-                        try:
-                            disabled = await publish_locator.evaluate(
-                                "el => !!(el.disabled || el.getAttribute('disabled') || el.getAttribute('aria-disabled') === 'true')"
-                            )
-                        except Exception:
-                            disabled = False
-                        if not disabled:
-                            break
-                        await asyncio.sleep(0.3)
-                    
-                    # 先hover，触发可能的样式与事件
+                    existing_indicators = await success_indicator.count()
+                except Exception:
+                    pass
+                try:
+                    # 滚动到视图中、派发mouseover、等待解除禁用，一次evaluate完成
                     try:
-                        await publish_locator.hover()
-                        await asyncio.sleep(0.2)
+                        await publish_locator.evaluate(_PREPARE_PUBLISH_CLICK_JS)
                     except Exception:
                         pass
                     
@@ -1710,67 +2179,20 @@ class RealXHSPublisher:
                 except Exception as e:
                     logger.error(f"❌ 发布按钮点击过程失败: {e}")
             
-            # 基于可访问性角色的回退
-            if not publish_clicked:
-                try:
-                    btn_locator = self.page.get_by_role("button", name=re.compile("(发布|确认发布|立即发布)"))
-                    count = await btn_locator.count()
-                    if count > 0:
-                        target = btn_locator.first
-                        await target.scroll_into_view_if_needed()
-                        await asyncio.sleep(0.3)
-                        await target.click()
-                        logger.info("✅ 通过角色名点击发布按钮")
-                        publish_clicked = True
-                except Exception as e:
-                    logger.debug(f"基于角色查找发布按钮失败: {e}")
-            
-            # XPath回退
-            if not publish_clicked:
-                try:
-                    xpath_locator = self.page.locator('xpath=//span[contains(normalize-space(.), "发布")]/ancestor::button[1]')
-                    if await xpath_locator.count() > 0:
-                        target = xpath_locator.first
-                        await target.scroll_into_view_if_needed()
-                        await asyncio.sleep(0.3)
-                        await target.click()
-                        logger.info("✅ 通过XPath点击发布按钮")
-                        publish_clicked = True
-                except Exception as e:
-                    logger.debug(f"XPath 查找发布按钮失败: {e}")
-            
             if publish_clicked:
-                # 点击后稍作等待，等待提交或弹窗动作 - 参考备份版本
-                await self._wait_for_page_ready()
-                await asyncio.sleep(random.uniform(0.8, 1.5))
-                
-                # 等待发布完成
-                await asyncio.sleep(5)
-                
-                # 检查发布结果 - 参考备份版本的简洁逻辑
-                success_indicators = [
-                    'text=发布成功',
-                    'text=发表成功',
-                    'text=提交成功',
-                    'text=已发布',
-                    '[class*="success"]'
-                ]
-                
-                # 检查是否有明确的成功指示器
-                for indicator in success_indicators:
-                    try:
-                        element = await self.page.query_selector(indicator)
-                        if element and await element.is_visible():
-                            logger.info("🎉 笔记发布成功！")
-                            return {
-                                "success": True,
-                                "message": "笔记发布成功",
-                                "title": title,
-                                "content": content,
-                                "images_count": len(images) if images else 0
-                            }
-                    except:
-                        continue
+                # 点击后只等待新出现的成功指示器（最多7秒），出现即返回
+                try:
+                    await success_indicator.nth(existing_indicators).wait_for(state='visible', timeout=7000)
+                    logger.info("🎉 笔记发布成功！")
+                    return {
+                        "success": True,
+                        "message": "笔记发布成功",
+                        "title": title,
+                        "content": content,
+                        "images_count": len(images) if images else 0
+                    }
+                except Exception:
+                    pass
                 
                 # 如果没有明确的成功提示，假设发布成功 - 参考备份版本
                 logger.info("✅ 发布操作完成")
@@ -1793,55 +2215,29 @@ class RealXHSPublisher:
         try:
             logger.info("🔍 寻找'新的创作'按钮...")
             
-            # 定义"新的创作"按钮的多种选择器
-            new_creation_selectors = [
-                # 基于用户提供的HTML结构
-                'button:has-text("新的创作")',
-                'button[class*="new-btn"]:has-text("新的创作")',
-                'button[data-v-52f51a04]:has-text("新的创作")',
-                
-                # 通用选择器
-                'button:has-text("新的创作")',
-                'button:has-text("创作")',
-                'button:has-text("写长文")',
-                'button:has-text("发布")',
-                
-                # CSS类选择器
-                'button.new-btn',
-                'button[class*="new"]',
-                'button[class*="create"]',
-                'button[class*="publish"]',
-                
-                # 包含SVG图标的按钮
-                'button:has(svg)',
-                'button:has(span:has-text("新的创作"))',
-                
-                # 更具体的选择器
-                'div[class*="summary-content"] button',
-                'div[class*="content"] button:first-child',
-            ]
+            # 所有选择器合并为一个选择器组，只等待一次（最多5秒），而不是逐个等待
+            try:
+                await self.page.locator(_NEW_CREATION_SELECTOR_GROUP).first.wait_for(state='visible', timeout=5000)
+            except Exception as e:
+                logger.debug(f"等待'新的创作'按钮超时: {e}")
             
-            for selector in new_creation_selectors:
+            # 按优先级选出当前可见的第一个按钮（is_visible不等待）
+            for selector in _NEW_CREATION_SELECTORS:
                 try:
-                    logger.info(f"🔍 尝试选择器: {selector}")
+                    element = self.page.locator(selector).first
+                    if not await element.is_visible():
+                        continue
+                    logger.info(f"✅ 找到'新的创作'按钮: {selector}")
                     
-                    # 等待元素出现
-                    await self.page.wait_for_selector(selector, timeout=5000)
+                    # 滚动到元素位置
+                    await element.scroll_into_view_if_needed()
+                    await asyncio.sleep(1)
                     
-                    # 检查元素是否可见
-                    element = await self.page.query_selector(selector)
-                    if element and await element.is_visible():
-                        logger.info(f"✅ 找到'新的创作'按钮: {selector}")
-                        
-                        # 滚动到元素位置
-                        await element.scroll_into_view_if_needed()
-                        await asyncio.sleep(1)
-                        
-                        # 点击按钮
-                        await element.click()
-                        logger.info("🎯 成功点击'新的创作'按钮")
-                        
-                        return True
+                    # 点击按钮（Locator自带可操作性检查）
+                    await element.click(timeout=5000)
+                    logger.info("🎯 成功点击'新的创作'按钮")
+                    
+                    return True
                         
                 except Exception as e:
                     logger.debug(f"选择器 {selector} 失败: {e}")
@@ -1877,82 +2273,76 @@ class RealXHSPublisher:
     async def _check_editor_presence(self) -> bool:
         """检查编辑器是否存在"""
         try:
-            # 检查常见的编辑器元素
-            editor_selectors = [
-                'textarea[placeholder*="输入标题"]',
-                'div[contenteditable="true"]',
-                '.editor',
-                '.tiptap',
-                'textarea',
-                'input[placeholder*="标题"]'
-            ]
-            
-            for selector in editor_selectors:
-                try:
-                    await self.page.wait_for_selector(selector, timeout=3000)
-                    return True
-                except:
-                    continue
-            
-            return False
+            # 任一常见编辑器元素挂载到DOM即可，合并为一个选择器只等待一次
+            # （不要求可见：选择器组的第一个匹配可能是隐藏的textarea）
+            try:
+                await self.page.locator(_EDITOR_SELECTOR).first.wait_for(state='attached', timeout=3000)
+                return True
+            except:
+                return False
         except Exception as e:
             logger.debug(f"检查编辑器失败: {e}")
             return False
 
-    async def _click_button_with_selectors(self, button_name: str, selectors: List[str], required: bool = False) -> bool:
-        """通用按钮点击方法"""
+    async def _click_button_with_selectors(self, button_name: str, selectors: List[str], required: bool = False,
+                                           element: Optional[ElementHandle] = None) -> bool:
+        """通用按钮点击方法；element为预先找到的按钮，已失效或为空时重新查找"""
         try:
             logger.info(f"🔍 寻找并点击『{button_name}』按钮")
             
-            for selector in selectors:
+            # 预先找到的按钮可能因前一步点击而被移除或隐藏
+            if element is not None:
                 try:
-                    element = await self.page.query_selector(selector)
-                    if element and await element.is_visible():
-                        # 智能点击，避免遮挡
-                        await element.scroll_into_view_if_needed()
-                        await asyncio.sleep(HumanBehaviorSimulator.reading_delay())
-                        
-                        # 模拟用户观察按钮（思考延迟）
-                        await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
-                        
-                        # 使用智能坐标生成（模拟真人点击习惯）
-                        box = await element.bounding_box()
-                        if box:
-                            # 使用智能坐标生成
-                            x, y = HumanBehaviorSimulator.generate_human_click_coordinates(box)
-                            
-                            # 获取当前鼠标位置
-                            current_mouse = await self.page.evaluate("() => ({ x: 0, y: 0 })")
-                            
-                            # 生成真实的鼠标移动路径
-                            mouse_path = HumanBehaviorSimulator.generate_mouse_path(
-                                current_mouse.get('x', 0), current_mouse.get('y', 0), x, y
-                            )
-                            
-                            # 沿路径移动鼠标
-                            for path_x, path_y in mouse_path[:-1]:
-                                await self.page.mouse.move(path_x, path_y)
-                                await asyncio.sleep(random.uniform(0.02, 0.08))
-                            
-                            # 最终移动到目标位置
-                            await self.page.mouse.move(x, y)
-                            await asyncio.sleep(HumanBehaviorSimulator.mouse_move_delay())
-                            
-                            # 可能的犹豫
-                            if HumanBehaviorSimulator.random_pause():
-                                await asyncio.sleep(HumanBehaviorSimulator.hesitation_delay())
-                            
-                            await self.page.mouse.click(x, y)
+                    if not await element.is_visible():
+                        element = None
+                except Exception:
+                    element = None
+            
+            # 一次evaluate_handle按优先级找出第一个可见且未禁用的按钮
+            if element is None:
+                element = await self._find_first_visible_enabled(selectors, cache_key=button_name)
+            if element:
+                # 智能点击，避免遮挡
+                await element.scroll_into_view_if_needed()
+                await asyncio.sleep(HumanBehaviorSimulator.reading_delay())
+                
+                # 模拟用户观察按钮（思考延迟）
+                await asyncio.sleep(HumanBehaviorSimulator.thinking_delay())
+                
+                # 使用智能坐标生成（模拟真人点击习惯）
+                box = await element.bounding_box()
+                if box:
+                    # 使用智能坐标生成
+                    x, y = HumanBehaviorSimulator.generate_human_click_coordinates(box)
+                    
+                    # 从上一次记录的鼠标位置出发，生成真实的鼠标移动路径
+                    mouse_path = HumanBehaviorSimulator.generate_mouse_path(*self._last_mouse, x, y)
+                    
+                    # 沿路径移动鼠标，每4个点停顿一次，其余点只让出事件循环
+                    for i, (path_x, path_y) in enumerate(mouse_path[:-1]):
+                        await self.page.mouse.move(path_x, path_y)
+                        if i % 4 == 0:
+                            await asyncio.sleep(random.uniform(0.02, 0.08))
                         else:
-                            await element.click()
-                        
-                        logger.info(f"✅ 『{button_name}』按钮点击完成")
-                        # 按钮序列操作延迟
-                        await asyncio.sleep(HumanBehaviorSimulator.button_sequence_delay())
-                        return True
-                except Exception as e:
-                    logger.debug(f"『{button_name}』选择器失败 {selector}: {e}")
-                    continue
+                            await asyncio.sleep(0)
+                    
+                    # 最终移动到目标位置
+                    await self.page.mouse.move(x, y)
+                    await asyncio.sleep(HumanBehaviorSimulator.mouse_move_delay())
+                    
+                    # 可能的犹豫
+                    if HumanBehaviorSimulator.random_pause():
+                        await asyncio.sleep(HumanBehaviorSimulator.hesitation_delay())
+                    
+                    await self.page.mouse.click(x, y)
+                    self._last_mouse = (x, y)
+                else:
+                    await element.click(timeout=5000)
+                
+                logger.info(f"✅ 『{button_name}』按钮点击完成")
+                # 按钮序列操作延迟
+                await asyncio.sleep(HumanBehaviorSimulator.button_sequence_delay())
+                return True
             
             if required:
                 logger.error(f"❌ 未找到『{button_name}』按钮")
@@ -1968,23 +2358,38 @@ class RealXHSPublisher:
     async def close_browser(self):
         """关闭浏览器"""
         try:
-            if self.browser:
-                await self.browser.close()
-                self.browser = None
+            if self._http is not None:
+                await self._http.close()
+                self._http = None
+            
+            self._cdp = None
+            self._warm_page = None
+            
+            if self._finalizer is not None:
+                self._finalizer.detach()
+                self._finalizer = None
+            
+            if self.context:
+                # 保存登录态，下次创建上下文时恢复
+                await self.context.storage_state(path=self.state_path)
+                await self.context.close()
+                self.context = None
                 self.page = None
                 logger.info("浏览器已关闭")
             
-            if self.playwright:
-                await self.playwright.stop()
-                self.playwright = None
-                
         except Exception as e:
             logger.error(f"关闭浏览器时出错: {e}")
+        finally:
+            # 释放共享浏览器引用，最后一个发布器关闭时一并关闭Browser和驱动
+            await self._release_browser()
     
-    def __del__(self):
-        """析构函数"""
+    async def _release_browser(self):
+        """释放本实例持有的共享浏览器引用"""
+        if self.browser is None:
+            return
+        self.browser = None
+        self.playwright = None
         try:
-            if self.browser:
-                asyncio.create_task(self.close_browser())
-        except:
-            pass
\ No newline at end of file
+            await _release_shared_browser(self._shared_generation)
+        except Exception as e:
+            logger.error(f"释放共享浏览器时出错: {e}")
@@ -6,15 +6,230 @@ Cloudflared隧道管理器
 
 import os
 import re
+import errno
+import socket
 import time
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import subprocess
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+# 优先使用libyaml的C实现，未编译libyaml时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
 
 logger = logging.getLogger(__name__)
 
+# metrics中的隧道域名、日志中的quick tunnel地址（预编译，轮询时直接匹配）
+_METRICS_URL_RE = re.compile(r'cloudflared_tunnel_user_hostnames_counts\{userHostname="([^"]+)"\}')
+_TRYCLOUDFLARE_RE = re.compile(r'https://[a-z0-9\-]+\.trycloudflare\.com', re.IGNORECASE)
+
+# cloudflared本地metrics端口
+_METRICS_PORT = 20242
+
+# 端口探测被系统拒绝（无权限）时的错误码，此时回退到进程/netstat检查
+_PROBE_ACCESS_DENIED = (errno.EACCES, 10013)  # 10013 = WSAEACCES
+
+# 从日志末尾读取的字节数
+_LOG_TAIL_BYTES = 16384
+
+# 默认openapi.yaml内容（预先序列化，创建时只替换服务器地址）
+_DEFAULT_OPENAPI_YAML = """\
+openapi: 3.0.0
+info:
+  title: 小红书MCP发布器
+  description: 用于自动发布内容到小红书平台的MCP插件，支持图文发布、登录状态检测等功能
+  version: 1.0.0
+  contact:
+    name: 小红书MCP发布器
+    url: https://github.com/your-repo/redbook_mcp
+servers:
+- url: __BASE_URL__
+  description: 本地开发服务器
+paths:
+  /api/health:
+    get:
+      summary: 健康检查
+      description: 检查服务是否正常运行
+      operationId: healthCheck
+      responses:
+        '200':
+          description: 服务正常
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  code:
+                    type: integer
+                    example: 0
+                  msg:
+                    type: string
+                    example: success
+                  data:
+                    type: object
+                    properties:
+                      status:
+                        type: string
+                        example: healthy
+                      service:
+                        type: string
+                        example: 小红书MCP发布器
+                      version:
+                        type: string
+                        example: 1.0.0
+  /api/detect-login:
+    get:
+      summary: 检测登录状态
+      description: 检测指定用户在小红书平台的登录状态
+      operationId: detectLogin
+      parameters:
+      - name: user_id
+        in: query
+        description: 用户ID，默认为default
+        required: false
+        schema:
+          type: string
+          default: default
+      responses:
+        '200':
+          description: 检测成功
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  code:
+                    type: integer
+                    example: 0
+                  msg:
+                    type: string
+                    example: success
+                  data:
+                    type: object
+                    properties:
+                      success:
+                        type: boolean
+                        example: true
+                      logged_in:
+                        type: boolean
+                        example: true
+                      confidence:
+                        type: string
+                        example: high
+                      message:
+                        type: string
+                        example: 检测完成
+  /api/publish:
+    post:
+      summary: 发布小红书笔记
+      description: 发布图文内容到小红书平台
+      operationId: publishNote
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              type: object
+              required:
+              - content
+              properties:
+                user_id:
+                  type: string
+                  description: 用户ID
+                  default: default
+                content:
+                  type: string
+                  description: 笔记内容
+                  example: 这是一篇测试笔记的内容
+                title:
+                  type: string
+                  description: 笔记标题
+                  example: 测试笔记标题
+                images:
+                  type: array
+                  description: 图片URL列表
+                  items:
+                    type: string
+                dry_run:
+                  type: boolean
+                  description: 是否为测试模式（不实际发布）
+                  default: false
+      responses:
+        '200':
+          description: 发布成功
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  code:
+                    type: integer
+                    example: 0
+                  msg:
+                    type: string
+                    example: success
+                  data:
+                    type: object
+                    properties:
+                      success:
+                        type: boolean
+                        example: true
+                      message:
+                        type: string
+                        example: 发布成功
+  /api/preview:
+    post:
+      summary: 预览发布内容
+      description: 预览即将发布的内容，不实际发布
+      operationId: previewNote
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                content:
+                  type: string
+                  description: 笔记内容
+                title:
+                  type: string
+                  description: 笔记标题
+                images:
+                  type: array
+                  description: 图片URL列表
+                  items:
+                    type: string
+      responses:
+        '200':
+          description: 预览成功
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  code:
+                    type: integer
+                    example: 0
+                  msg:
+                    type: string
+                    example: success
+                  data:
+                    type: object
+                    properties:
+                      success:
+                        type: boolean
+                        example: true
+                      message:
+                        type: string
+                        example: 预览生成成功
+"""
+
 
 class TunnelManager:
     """Cloudflared隧道管理器"""
@@ -23,21 +238,42 @@ class TunnelManager:
         self.openapi_file = openapi_file
         self.tunnel_url = None
         self.cloudflared_proc: Optional[subprocess.Popen] = None
-        self.metrics_endpoint = "http://127.0.0.1:20242/metrics"
+        self.metrics_endpoint = f"http://127.0.0.1:{_METRICS_PORT}/metrics"
+        # 解析后的openapi.yaml及其修改时间，文件未变时不重复解析
+        self._openapi_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        # 复用到本地metrics端口的长连接，轮询时不必每次重新建立TCP连接
+        self._session = requests.Session()
+        self._session.mount('http://127.0.0.1', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0))
+    
+    def close(self):
+        """关闭metrics查询使用的HTTP会话"""
+        self._session.close()
 
     # ================= 隧道启动与检测 =================
 
-    def is_cloudflared_running(self) -> bool:
-        """判断 cloudflared 是否在运行（通过 metrics 或进程名）"""
-        # 先尝试 metrics
+    def _metrics_port_listening(self) -> Optional[bool]:
+        """探测metrics端口是否在监听；无权限探测时返回None"""
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.settimeout(0.2)
         try:
-            resp = requests.get(self.metrics_endpoint, timeout=3)
-            if resp.status_code == 200:
-                return True
-        except Exception:
-            pass
+            rc = s.connect_ex(("127.0.0.1", _METRICS_PORT))
+        finally:
+            s.close()
+        if rc in _PROBE_ACCESS_DENIED:
+            return None
+        return rc == 0
+
+    def is_cloudflared_running(self) -> bool:
+        """判断 cloudflared 是否在运行（自己启动的进程 / metrics 端口 / 进程名）"""
+        # 自己启动的进程仍存活（可能尚未开始监听metrics端口）
+        if self.cloudflared_proc is not None and self.cloudflared_proc.poll() is None:
+            return True
+
+        if self._metrics_port_listening():
+            return True
 
-        # 再查进程（Windows 环境）
+        # 端口未监听或无法探测时再查进程名（Windows 环境），
+        # 避免把已启动但尚未监听端口的 cloudflared 误判为未运行
         try:
             result = subprocess.run(
                 ["tasklist", "/FI", "IMAGENAME eq cloudflared.exe"],
@@ -87,14 +323,12 @@ class TunnelManager:
         """从cloudflared metrics API获取隧道URL"""
         try:
             # cloudflared默认在127.0.0.1:20242提供metrics
-            response = requests.get(self.metrics_endpoint, timeout=5)
+            response = self._session.get(self.metrics_endpoint, timeout=5)
             if response.status_code == 200:
-                metrics_text = response.text
-                # 查找隧道URL的模式
-                url_pattern = r'cloudflared_tunnel_user_hostnames_counts{userHostname="([^"]+)"}'
-                matches = re.findall(url_pattern, metrics_text)
-                if matches:
-                    hostname = matches[0]
+                # 查找隧道URL，只需要第一个匹配
+                match = _METRICS_URL_RE.search(response.text)
+                if match:
+                    hostname = match.group(1)
                     # 确保不重复添加https://
                     if hostname.startswith('http://') or hostname.startswith('https://'):
                         return hostname
@@ -105,7 +339,12 @@ class TunnelManager:
         return None
     
     def get_tunnel_url_from_process(self) -> Optional[str]:
-        """通过检查cloudflared进程输出获取隧道URL"""
+        """通过检查cloudflared的metrics端口获取隧道URL"""
+        listening = self._metrics_port_listening()
+        if listening is not None:
+            return self.get_tunnel_url_from_metrics() if listening else None
+        
+        # 无法探测端口时回退到netstat
         try:
             # 使用netstat查找cloudflared进程
             result = subprocess.run(
@@ -129,6 +368,9 @@ class TunnelManager:
         """等待隧道URL可用"""
         logger.info("等待cloudflared隧道启动...")
         
+        # 端口可探测时，进程检查只会重复一次metrics查询；仅在无权限探测端口时才需要netstat
+        check_process = self._metrics_port_listening() is None
+        delay = 0.1
         start_time = time.time()
         while time.time() - start_time < max_wait_time:
             # 首先尝试从metrics获取
@@ -139,11 +381,12 @@ class TunnelManager:
                 return url
             
             # 如果metrics不可用，尝试其他方法
-            url = self.get_tunnel_url_from_process()
-            if url:
-                logger.info(f"✅ 成功获取隧道URL: {url}")
-                self.tunnel_url = url
-                return url
+            if check_process:
+                url = self.get_tunnel_url_from_process()
+                if url:
+                    logger.info(f"✅ 成功获取隧道URL: {url}")
+                    self.tunnel_url = url
+                    return url
 
             # 尝试从日志文件提取
             log_url = self.get_tunnel_url_from_log()
@@ -152,7 +395,9 @@ class TunnelManager:
                 self.tunnel_url = log_url
                 return log_url
             
-            time.sleep(2)
+            # 指数退避：从100ms开始，最长2秒
+            time.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
         
         logger.warning(f"⚠️ 在{max_wait_time}秒内未能获取到隧道URL")
         return None
@@ -163,11 +408,17 @@ class TunnelManager:
             log_path = os.path.join(os.getcwd(), "cloudflared.log")
             if not os.path.exists(log_path):
                 return None
-            # 读取最近的内容
-            with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()[-10000:]  # 取最后10KB，避免文件过大
+            # 只读取末尾的内容，不随日志增长读入整个文件
+            with open(log_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - _LOG_TAIL_BYTES))
+                content = f.read().decode("utf-8", "ignore")
+            # 先做子串检查，没有域名时跳过正则
+            if 'trycloudflare' not in content.lower():
+                return None
             # 匹配 https://xxxx.trycloudflare.com
-            m = re.findall(r"https://[a-z0-9\-]+\.trycloudflare\.com", content, flags=re.IGNORECASE)
+            m = _TRYCLOUDFLARE_RE.findall(content)
             if m:
                 return m[-1]
         except Exception as e:
@@ -208,195 +459,9 @@ class TunnelManager:
     def create_default_openapi_yaml(self, base_url: str = "http://127.0.0.1:5001") -> bool:
         """创建默认的openapi.yaml文件"""
         try:
-            default_openapi = {
-                'openapi': '3.0.0',
-                'info': {
-                    'title': '小红书MCP发布器',
-                    'description': '用于自动发布内容到小红书平台的MCP插件，支持图文发布、登录状态检测等功能',
-                    'version': '1.0.0',
-                    'contact': {
-                        'name': '小红书MCP发布器',
-                        'url': 'https://github.com/your-repo/redbook_mcp'
-                    }
-                },
-                'servers': [
-                    {
-                        'url': base_url,
-                        'description': '本地开发服务器'
-                    }
-                ],
-                'paths': {
-                    '/api/health': {
-                        'get': {
-                            'summary': '健康检查',
-                            'description': '检查服务是否正常运行',
-                            'operationId': 'healthCheck',
-                            'responses': {
-                                '200': {
-                                    'description': '服务正常',
-                                    'content': {
-                                        'application/json': {
-                                            'schema': {
-                                                'type': 'object',
-                                                'properties': {
-                                                    'code': {'type': 'integer', 'example': 0},
-                                                    'msg': {'type': 'string', 'example': 'success'},
-                                                    'data': {
-                                                        'type': 'object',
-                                                        'properties': {
-                                                            'status': {'type': 'string', 'example': 'healthy'},
-                                                            'service': {'type': 'string', 'example': '小红书MCP发布器'},
-                                                            'version': {'type': 'string', 'example': '1.0.0'}
-                                                        }
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    '/api/detect-login': {
-                        'get': {
-                            'summary': '检测登录状态',
-                            'description': '检测指定用户在小红书平台的登录状态',
-                            'operationId': 'detectLogin',
-                            'parameters': [
-                                {
-                                    'name': 'user_id',
-                                    'in': 'query',
-                                    'description': '用户ID，默认为default',
-                                    'required': False,
-                                    'schema': {'type': 'string', 'default': 'default'}
-                                }
-                            ],
-                            'responses': {
-                                '200': {
-                                    'description': '检测成功',
-                                    'content': {
-                                        'application/json': {
-                                            'schema': {
-                                                'type': 'object',
-                                                'properties': {
-                                                    'code': {'type': 'integer', 'example': 0},
-                                                    'msg': {'type': 'string', 'example': 'success'},
-                                                    'data': {
-                                                        'type': 'object',
-                                                        'properties': {
-                                                            'success': {'type': 'boolean', 'example': True},
-                                                            'logged_in': {'type': 'boolean', 'example': True},
-                                                            'confidence': {'type': 'string', 'example': 'high'},
-                                                            'message': {'type': 'string', 'example': '检测完成'}
-                                                        }
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    '/api/publish': {
-                        'post': {
-                            'summary': '发布小红书笔记',
-                            'description': '发布图文内容到小红书平台',
-                            'operationId': 'publishNote',
-                            'requestBody': {
-                                'required': True,
-                                'content': {
-                                    'application/json': {
-                                        'schema': {
-                                            'type': 'object',
-                                            'required': ['content'],
-                                            'properties': {
-                                                'user_id': {'type': 'string', 'description': '用户ID', 'default': 'default'},
-                                                'content': {'type': 'string', 'description': '笔记内容', 'example': '这是一篇测试笔记的内容'},
-                                                'title': {'type': 'string', 'description': '笔记标题', 'example': '测试笔记标题'},
-                                                'images': {'type': 'array', 'description': '图片URL列表', 'items': {'type': 'string'}},
-                                                'dry_run': {'type': 'boolean', 'description': '是否为测试模式（不实际发布）', 'default': False}
-                                            }
-                                        }
-                                    }
-                                }
-                            },
-                            'responses': {
-                                '200': {
-                                    'description': '发布成功',
-                                    'content': {
-                                        'application/json': {
-                                            'schema': {
-                                                'type': 'object',
-                                                'properties': {
-                                                    'code': {'type': 'integer', 'example': 0},
-                                                    'msg': {'type': 'string', 'example': 'success'},
-                                                    'data': {
-                                                        'type': 'object',
-                                                        'properties': {
-                                                            'success': {'type': 'boolean', 'example': True},
-                                                            'message': {'type': 'string', 'example': '发布成功'}
-                                                        }
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    '/api/preview': {
-                        'post': {
-                            'summary': '预览发布内容',
-                            'description': '预览即将发布的内容，不实际发布',
-                            'operationId': 'previewNote',
-                            'requestBody': {
-                                'required': True,
-                                'content': {
-                                    'application/json': {
-                                        'schema': {
-                                            'type': 'object',
-                                            'properties': {
-                                                'content': {'type': 'string', 'description': '笔记内容'},
-                                                'title': {'type': 'string', 'description': '笔记标题'},
-                                                'images': {'type': 'array', 'description': '图片URL列表', 'items': {'type': 'string'}}
-                                            }
-                                        }
-                                    }
-                                }
-                            },
-                            'responses': {
-                                '200': {
-                                    'description': '预览成功',
-                                    'content': {
-                                        'application/json': {
-                                            'schema': {
-                                                'type': 'object',
-                                                'properties': {
-                                                    'code': {'type': 'integer', 'example': 0},
-                                                    'msg': {'type': 'string', 'example': 'success'},
-                                                    'data': {
-                                                        'type': 'object',
-                                                        'properties': {
-                                                            'success': {'type': 'boolean', 'example': True},
-                                                            'message': {'type': 'string', 'example': '预览生成成功'}
-                                                        }
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-            
             # 写入文件
             with open(self.openapi_file, 'w', encoding='utf-8') as f:
-                yaml.dump(default_openapi, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                f.write(_DEFAULT_OPENAPI_YAML.replace('__BASE_URL__', base_url))
             
             logger.info(f"✅ 已创建默认的openapi.yaml文件: {base_url}")
             return True
@@ -416,8 +481,13 @@ class TunnelManager:
                 return True
             
             # 读取现有的openapi.yaml
-            with open(self.openapi_file, 'r', encoding='utf-8') as f:
-                openapi_data = yaml.safe_load(f)
+            openapi_data = self._load_openapi()
+            
+            # URL未变化时不重写文件
+            servers = openapi_data.get('servers') or []
+            if servers and servers[0].get('url') == new_url:
+                logger.info(f"✅ openapi.yaml中的服务器URL已是最新: {new_url}")
+                return True
             
             # 更新服务器URL
             if 'servers' not in openapi_data:
@@ -432,20 +502,33 @@ class TunnelManager:
             
             # 写回文件
             with open(self.openapi_file, 'w', encoding='utf-8') as f:
-                yaml.dump(openapi_data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                yaml.dump(openapi_data, f, Dumper=_SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            self._openapi_cache = (os.path.getmtime(self.openapi_file), openapi_data)
             
             logger.info(f"✅ 已更新openapi.yaml中的服务器URL: {new_url}")
             return True
             
         except Exception as e:
+            # 缓存中的数据可能已被修改但未写入，丢弃
+            self._openapi_cache = None
             logger.error(f"❌ 更新openapi.yaml失败: {e}")
             return False
     
+    def _load_openapi(self) -> Dict[str, Any]:
+        """读取并解析openapi.yaml，文件修改时间未变时直接返回缓存"""
+        mtime = os.path.getmtime(self.openapi_file)
+        if self._openapi_cache is not None and self._openapi_cache[0] == mtime:
+            return self._openapi_cache[1]
+        
+        with open(self.openapi_file, 'r', encoding='utf-8') as f:
+            openapi_data = yaml.load(f, Loader=_SafeLoader)
+        self._openapi_cache = (mtime, openapi_data)
+        return openapi_data
+    
     def get_current_openapi_url(self) -> Optional[str]:
         """获取当前openapi.yaml中配置的URL"""
         try:
-            with open(self.openapi_file, 'r', encoding='utf-8') as f:
-                openapi_data = yaml.safe_load(f)
+            openapi_data = self._load_openapi()
             
             if 'servers' in openapi_data and len(openapi_data['servers']) > 0:
                 return openapi_data['servers'][0].get('url')